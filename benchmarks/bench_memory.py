@@ -0,0 +1,114 @@
+"""Compare memory used by merged entries stored as dicts and as ``Entry``.
+
+Usage:
+
+    python benchmarks/bench_memory.py [<days>]
+
+"""
+
+import os
+import sys
+import codecs
+import tracemalloc
+
+from tempfile import TemporaryDirectory
+
+from gtimesheet import timesheet
+from gtimesheet.sync import iter_sync
+from gtimesheet.sync import sync
+from gtimesheet.sync import sync_to_timesheet
+from gtimesheet.sync import SPLIT
+from gtimesheet.timelog import read_timelog
+from gtimesheet.timelog import resolvekw
+
+from generate import generate
+from generate import write_timelog
+from generate import write_timesheet_db
+
+MIDNIGHT = '06:00'
+
+
+def dict_timelog_to_timesheet(timelog, projects):
+    """``timelog_to_timesheet`` as it was, returning a plain dict."""
+    d1 = timelog['date1']
+    d2 = timelog['date2']
+    notes = list(map(str.strip, timelog['notes'].split(':', 2)))
+    client, project, notes = ['']*(3-len(notes)) + notes
+    project, project_id = resolvekw(project, projects, default=0)
+    return {
+        'clientName': client,
+        'projectName': project,
+        'project': '%d' % project_id,
+        'amountperhour': 0.0,
+        'date1': d1.strftime('%Y-%m-%d %H:%M'),
+        'date2': d2.strftime('%Y-%m-%d %H:%M'),
+        'working': (d2 - d1).seconds // 60,
+        'breaks': 0,
+        'overtime': 0,
+        'amount': 0.0,
+        'notes': notes,
+        'methodid': 0,
+        'status': 0,
+    }
+
+
+def dict_entries(db, timelog_path):
+    """Merge entries the way it was done with plain dicts."""
+    projects = timesheet.get_project_mapping(db)
+    entries = []
+    with codecs.open(timelog_path, encoding='utf-8') as f:
+        rows = timesheet.iter_rows(db.execute(timesheet.SELECT_TIMES))
+        for ts, tl in iter_sync(rows, read_timelog(f, MIDNIGHT), SPLIT):
+            if ts and tl:
+                entry = dict(dict_timelog_to_timesheet(tl, projects), **ts)
+            elif ts:
+                entry = dict(ts)
+            else:
+                entry = dict_timelog_to_timesheet(tl, projects)
+            entries.append(entry)
+    return entries
+
+
+def compact_entries(db, timelog_path):
+    merged = sync(db, timelog_path, MIDNIGHT, policy=SPLIT)
+    return [entry for source, entry in sync_to_timesheet(db, merged)]
+
+
+def measure(fn, *args):
+    """Return result of fn and memory still allocated after the call."""
+    tracemalloc.start()
+    result = fn(*args)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current, peak
+
+
+def main():
+    days = int(sys.argv[1]) if len(sys.argv) > 1 else 18000
+    with TemporaryDirectory() as path:
+        lines, rows = generate(days, overlaps=0.1)
+        timelog_path = os.path.join(path, 'timelog.txt')
+        timesheet_path = os.path.join(path, 'timesheet.db')
+        write_timelog(timelog_path, lines)
+        write_timesheet_db(timesheet_path, rows)
+        db = timesheet.connect(timesheet_path)
+
+        results = []
+        for name, fn in [('dict', dict_entries), ('Entry', compact_entries)]:
+            entries, current, peak = measure(fn, db, timelog_path)
+            results.append((name, entries, current, peak))
+
+    assert results[0][1] == results[1][1]
+    count = len(results[0][1])
+    print('%d entries' % count)
+    print('%-8s %14s %14s %10s' % ('', 'per 100k, MiB', 'peak, MiB', 'bytes'))
+    for name, entries, current, peak in results:
+        print('%-8s %14.1f %14.1f %10d' % (
+            name, current * 100000 / count / 2**20, peak / 2**20,
+            current // count,
+        ))
+    print('reduction %.0f%%' % (100 - 100 * results[1][2] / results[0][2]))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""Measure gtimesheet startup imports per subcommand with -X importtime.
+
+Usage:
+
+    python benchmarks/bench_startup.py
+
+For each subcommand prints total import time and heavy dependencies that
+were imported.
+
+"""
+
+import os
+import sys
+import sqlite3
+import subprocess
+
+from tempfile import TemporaryDirectory
+
+HEAVY = ['dataset', 'sqlalchemy', 'arrow', 'isoweek', 'gtimelog',
+         'matplotlib']
+
+SUBCOMMANDS = [
+    ['--version'],
+    [],
+    ['stats'],
+    ['overtime'],
+    ['overtime-graph'],
+    ['send', '--dry-run', '--batch'],
+]
+
+CONFIG = '''\
+[gtimelog]
+name = Me
+list-email = list@example.com
+virtual_midnight = 06:00
+
+[gtimesheet]
+from-email = me@example.com
+sent-reports = {path}/sentreports.log
+timesheet-db = {path}/timesheet.db
+timelog = {path}/timelog.txt
+holidays = {path}/holidays.cfg
+smtp-ask-password = no
+'''
+
+RUN = 'import sys; from gtimesheet.tools import gtimesheet; sys.exit(gtimesheet())'
+
+
+def setup(path):
+    with open(os.path.join(path, 'gtimelogrc'), 'w') as f:
+        f.write(CONFIG.format(path=path))
+    with open(os.path.join(path, 'timelog.txt'), 'w') as f:
+        f.write('2014-03-24 09:00: start\n2014-03-24 12:00: project: task\n')
+    with open(os.path.join(path, 'holidays.cfg'), 'w') as f:
+        f.write('2014-01-01  New year\n')
+    db = sqlite3.connect(os.path.join(path, 'timesheet.db'))
+    db.execute(
+        'CREATE TABLE times (id INTEGER PRIMARY KEY, date1 TEXT, date2 TEXT, '
+        'breaks INTEGER, clientName TEXT, projectName TEXT, project TEXT, '
+        'notes TEXT)'
+    )
+    db.close()
+
+
+def importtime(args, path):
+    env = dict(os.environ, MPLBACKEND='Agg')
+    if args != ['--version']:
+        args = args + ['--config=%s' % os.path.join(path, 'gtimelogrc')]
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', RUN] + args,
+        stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE, universal_newlines=True, env=env,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError('gtimesheet %s failed:\n%s' % (
+            ' '.join(args), proc.stderr[-2000:],
+        ))
+    total = 0
+    modules = set()
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        parts = line[len('import time:'):].split('|')
+        if not parts[0].strip().isdigit():
+            continue
+        name = parts[2].strip()
+        if not parts[2].startswith('  '):
+            total += int(parts[1])
+        modules.add(name.split('.')[0])
+    return total, [name for name in HEAVY if name in modules]
+
+
+def main():
+    with TemporaryDirectory() as path:
+        setup(path)
+        for args in SUBCOMMANDS:
+            total, heavy = importtime(args, path)
+            print('%-22s %8.1f ms  %s' % (
+                ' '.join(args) or '(default)', total / 1000.0,
+                ', '.join(heavy),
+            ))
+
+
+if __name__ == '__main__':
+    main()
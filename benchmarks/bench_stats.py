@@ -0,0 +1,119 @@
+"""Compare pure Python and NumPy implementations of per-day statistics.
+
+Usage:
+
+    python benchmarks/bench_stats.py [<days>]
+
+"""
+
+import sys
+import datetime
+import timeit
+
+from io import StringIO
+
+from gtimesheet.holidays import Holidays
+from gtimesheet.stats import stats_by_day
+from gtimesheet.overtime import get_overtime
+
+combine = datetime.datetime.combine
+virtual_midnight = datetime.time(6, 0)
+
+
+def generate_entries(days, entries_per_day=4):
+    fmt = '%Y-%m-%d %H:%M'
+    start = datetime.datetime(2010, 1, 1, 9, 0)
+    entries = []
+    for i in range(days):
+        time = start + datetime.timedelta(days=i)
+        for j in range(entries_per_day):
+            end = time + datetime.timedelta(minutes=90 + j)
+            entries.append({
+                'date1': time.strftime(fmt),
+                'date2': end.strftime(fmt),
+                'breaks': j,
+                'notes': 'task %d' % j,
+            })
+            time = end + datetime.timedelta(minutes=15)
+    return entries
+
+
+def python_stats_by_day(entries):
+    # Implementation used before NumPy columnar engine.
+    fmt = '%Y-%m-%d %H:%M'
+    xday = last = None
+    time = datetime.timedelta()
+    for entry in entries:
+        if entry['notes'].endswith('*'): continue
+
+        date1 = datetime.datetime.strptime(entry['date1'], fmt)
+        date2 = datetime.datetime.strptime(entry['date2'], fmt)
+
+        if entry['breaks']:
+            date2 -= datetime.timedelta(minutes=entry['breaks'])
+
+        day = combine(date1, datetime.time())
+        if date1.time() <= virtual_midnight:
+            day = day - datetime.timedelta(days=1)
+
+        if last is not None and last != day:
+            while xday < last:
+                yield xday, datetime.timedelta()
+                xday += datetime.timedelta(days=1)
+            yield last, time
+            time = datetime.timedelta()
+            xday = last + datetime.timedelta(days=1)
+
+        time += date2 - date1
+        last = day
+        if xday is None:
+            xday = last + datetime.timedelta(days=1)
+
+    if last is not None:
+        yield last, time
+
+
+def python_get_overtime(entries, perday, holidays):
+    totaltime = datetime.timedelta()
+    worktime = datetime.timedelta()
+    overtime = datetime.timedelta()
+    for date, time in python_stats_by_day(entries):
+        totaltime += perday
+        worktime += time
+        if holidays.is_holiday(date):
+            overtime += time
+            continue
+
+        if time > perday:
+            overtime += time - perday
+        else:
+            overtime -= perday - time
+
+    return totaltime, worktime, overtime
+
+
+def main():
+    days = int(sys.argv[1]) if len(sys.argv) > 1 else 3650
+    entries = generate_entries(days)
+    holidays = Holidays([StringIO('2010-12-24/3  Christmas\n')])
+    perday = datetime.timedelta(hours=8)
+    print('%d entries' % len(entries))
+
+    assert list(python_stats_by_day(entries)) == list(stats_by_day(entries))
+    assert (python_get_overtime(entries, perday, holidays) ==
+            get_overtime(entries, perday, holidays))
+
+    benchmarks = [
+        ('stats python', lambda: list(python_stats_by_day(entries))),
+        ('stats numpy', lambda: list(stats_by_day(entries))),
+        ('overtime python',
+         lambda: python_get_overtime(entries, perday, holidays)),
+        ('overtime numpy', lambda: get_overtime(entries, perday, holidays)),
+    ]
+    for name, fn in benchmarks:
+        best = min(timeit.repeat(fn, number=1, repeat=3))
+        print('%-16s %8.3f s' % (name, best))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""Compare timelog.txt parsing speed with the old strptime based parser.
+
+Usage:
+
+    python benchmarks/bench_timelog.py [<days>]
+
+"""
+
+import os
+import sys
+import codecs
+import datetime
+import timeit
+
+from io import StringIO
+from tempfile import NamedTemporaryFile
+
+from gtimesheet.timelog import parse_line
+from gtimesheet.timelog import read_timelog
+
+
+def generate_timelog(days, entries_per_day=8):
+    start = datetime.datetime(2010, 1, 1, 9, 0)
+    step = datetime.timedelta(minutes=47)
+    lines = []
+    for i in range(days):
+        time = start + datetime.timedelta(days=i)
+        lines.append('%s: start' % time.strftime('%Y-%m-%d %H:%M'))
+        for j in range(entries_per_day):
+            time += step
+            lines.append('%s: project: task %d' % (
+                time.strftime('%Y-%m-%d %H:%M'), j
+            ))
+        lines.append('')
+    return '\n'.join(lines) + '\n'
+
+
+def parse_line_strptime(line):
+    time, note = line.split(': ', 1)
+    return datetime.datetime.strptime(time, '%Y-%m-%d %H:%M'), note
+
+
+def main():
+    days = int(sys.argv[1]) if len(sys.argv) > 1 else 3650
+    data = generate_timelog(days)
+    lines = [line for line in data.splitlines() if line]
+
+    assert list(map(parse_line, lines)) == list(map(parse_line_strptime, lines))
+
+    print('%d lines' % len(lines))
+    for name, fn in [('strptime', parse_line_strptime), ('parse_line', parse_line)]:
+        best = min(timeit.repeat(lambda: list(map(fn, lines)), number=1, repeat=3))
+        print('%-12s %8.3f s' % (name, best))
+
+    best = min(timeit.repeat(
+        lambda: list(read_timelog(StringIO(data), '06:00')), number=1, repeat=3
+    ))
+    print('%-12s %8.3f s' % ('read_timelog', best))
+
+    f = NamedTemporaryFile('w', delete=False, encoding='utf-8')
+    f.write(data)
+    f.close()
+    since = datetime.date(2010, 1, 1) + datetime.timedelta(days=days - 7)
+
+    def read_last_week():
+        with codecs.open(f.name, encoding='utf-8') as timelog:
+            return list(read_timelog(timelog, '06:00', since=since))
+
+    best = min(timeit.repeat(read_last_week, number=1, repeat=3))
+    print('%-12s %8.5f s' % ('last week', best))
+    os.unlink(f.name)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""Compare reading Timesheet database with dataset and with sqlite3.
+
+Usage:
+
+    python benchmarks/bench_timesheet.py [<days>]
+
+"""
+
+import os
+import sys
+import sqlite3
+import datetime
+import timeit
+
+from tempfile import TemporaryDirectory
+
+from gtimesheet import timesheet
+
+def generate_timesheet_db(path, days, entries_per_day=4):
+    db = sqlite3.connect(path)
+    timesheet.create_times(db)
+    fmt = '%Y-%m-%d %H:%M'
+    start = datetime.datetime(2010, 1, 1, 9, 0)
+    rows = []
+    for i in range(days):
+        time = start + datetime.timedelta(days=i)
+        for j in range(entries_per_day):
+            end = time + datetime.timedelta(minutes=90)
+            rows.append((
+                '', 'project', '1', 0.0, time.strftime(fmt), end.strftime(fmt),
+                90, 0, 0, 0.0, 'task %d' % j, 0, 0,
+            ))
+            time = end + datetime.timedelta(minutes=15)
+    db.executemany('INSERT INTO times (%s) VALUES (%s)' % (
+        ', '.join(name for name, type in timesheet.COLUMNS),
+        ', '.join('?' for column in timesheet.COLUMNS),
+    ), rows)
+    db.commit()
+    db.close()
+    return len(rows)
+
+
+def main():
+    days = int(sys.argv[1]) if len(sys.argv) > 1 else 3650
+    with TemporaryDirectory() as path:
+        path = os.path.join(path, 'timesheet.db')
+        print('%d rows' % generate_timesheet_db(path, days))
+
+        def read_sqlite3():
+            db = timesheet.connect(path)
+            timesheet.get_project_mapping(db)
+            rows = list(timesheet.iter_times(db))
+            db.close()
+            return rows
+
+        benchmarks = [('sqlite3', read_sqlite3)]
+
+        try:
+            import dataset
+        except ImportError:
+            print('dataset is not installed, skipping.')
+        else:
+            def read_dataset():
+                db = dataset.connect('sqlite:///%s' % path)
+                list(db['times'].distinct('projectName', 'project'))
+                rows = list(db['times'].find(order_by=['date1']))
+                db.close()
+                return rows
+
+            rows = read_sqlite3()
+            assert [dict(row) for row in read_dataset()] == rows
+            benchmarks.insert(0, ('dataset', read_dataset))
+
+        for name, fn in benchmarks:
+            best = min(timeit.repeat(fn, number=1, repeat=3))
+            print('%-12s %8.3f s' % (name, best))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+"""Generate synthetic timelog.txt and Timesheet database.
+
+Usage:
+  generate.py [--days=<days>] [--entries=<n>] [--breaks=<ratio>]
+              [--overlaps=<ratio>] [--seed=<seed>] <directory>
+
+Options:
+  --days=<days>         Number of days to generate. [default: 3650]
+  --entries=<n>         Entries per working day. [default: 6]
+  --breaks=<ratio>      Share of Timesheet entries with breaks. [default: 0.2]
+  --overlaps=<ratio>    Share of days with overlapping entries. [default: 0]
+  --seed=<seed>         Random seed. [default: 0]
+
+Working days are logged either with gtimelog, with Timesheet on the phone, or
+with both, in which case the same entries are found in both sources.  Weekends
+are not worked.
+
+"""
+
+import os
+import random
+import sqlite3
+import datetime
+
+from docopt import docopt
+
+from gtimesheet import timesheet
+
+FORMAT = '%Y-%m-%d %H:%M'
+START = datetime.date(2010, 1, 4)
+
+PROJECTS = ['gtimesheet', 'website', 'admin']
+
+
+def generate(days, entries_per_day=6, breaks=0.2, overlaps=0.0, seed=0,
+             start=START):
+    """Generate timelog.txt lines and Timesheet times table rows.
+
+    :breaks: share of Timesheet entries, that have breaks.
+    :overlaps: share of gtimelog days, which also have an overlapping
+               Timesheet entry.
+    """
+    rnd = random.Random(seed)
+    minutes = lambda n: datetime.timedelta(minutes=n)
+    lines = []
+    rows = []
+    for i in range(days):
+        day = start + datetime.timedelta(days=i)
+        if day.isoweekday() in (6, 7):
+            continue
+
+        kind = rnd.choice(['timelog', 'timelog', 'timelog', 'timesheet',
+                           'both'])
+        time = datetime.datetime.combine(day, datetime.time(9, 0))
+        time += minutes(rnd.randint(0, 60))
+
+        tasks = []
+        for j in range(entries_per_day):
+            gap = rnd.choice([0, 0, 0, 30, 45])
+            date1 = time + minutes(gap)
+            date2 = date1 + minutes(rnd.randint(15, 120))
+            tasks.append((gap, date1, date2, rnd.choice(PROJECTS), j))
+            time = date2
+
+        if kind in ('timelog', 'both'):
+            if lines:
+                lines.append('')
+            lines.append('%s: arrived' % tasks[0][1].strftime(FORMAT))
+            for j, (gap, date1, date2, project, task) in enumerate(tasks):
+                if gap and j:
+                    lines.append('%s: lunch **' % date1.strftime(FORMAT))
+                lines.append('%s: %s: task %d' % (
+                    date2.strftime(FORMAT), project, task,
+                ))
+
+        if kind in ('timesheet', 'both'):
+            for j, (gap, date1, date2, project, task) in enumerate(tasks):
+                last = j + 1 == len(tasks)
+                pause = 0
+                # Timesheet entry with break ends later than gtimelog entry,
+                # so on days logged with both, only entries followed by a
+                # gap can have breaks.
+                if rnd.random() < breaks:
+                    if kind == 'timesheet' or last or tasks[j + 1][0]:
+                        pause = 15
+                rows.append(timesheet_row(date1, date2 + minutes(pause),
+                                          project, task, pause))
+
+        elif rnd.random() < overlaps:
+            gap, date1, date2, project, task = rnd.choice(tasks)
+            date1 += (date2 - date1) // 2
+            rows.append(timesheet_row(date1, date1 + minutes(30), project,
+                                      task, 0))
+
+    rows.sort(key=lambda row: row[4])
+    return lines, rows
+
+
+def timesheet_row(date1, date2, project, task, breaks):
+    working = (date2 - date1).seconds // 60 - breaks
+    return (
+        '', project, '%d' % (PROJECTS.index(project) + 1), 0.0,
+        date1.strftime(FORMAT), date2.strftime(FORMAT), working, breaks, 0,
+        0.0, 'task %d' % task, 0, 0,
+    )
+
+
+def write_timelog(path, lines):
+    with open(path, 'w', encoding='utf-8') as f:
+        for line in lines:
+            f.write(line + '\n')
+
+
+def write_timesheet_db(path, rows):
+    db = sqlite3.connect(path)
+    timesheet.create_times(db)
+    db.executemany('INSERT INTO times (%s) VALUES (%s)' % (
+        ', '.join(name for name, type in timesheet.COLUMNS),
+        ', '.join('?' for column in timesheet.COLUMNS),
+    ), rows)
+    db.commit()
+    db.close()
+
+
+def main():
+    args = docopt(__doc__)
+    lines, rows = generate(
+        int(args['--days']),
+        int(args['--entries']),
+        float(args['--breaks']),
+        float(args['--overlaps']),
+        int(args['--seed']),
+    )
+    directory = args['<directory>']
+    if not os.path.exists(directory):
+        os.makedirs(directory)
+    write_timelog(os.path.join(directory, 'timelog.txt'), lines)
+    write_timesheet_db(os.path.join(directory, 'timesheet.db'), rows)
+    print('%d timelog lines and %d Timesheet rows written to %s' % (
+        len(lines), len(rows), directory,
+    ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,167 @@
+"""Run benchmarks on generated data and compare them with stored baselines.
+
+Usage:
+  suite.py [--days=<days>] [--entries=<n>] [--overlaps=<ratio>]
+           [--repeat=<n>] [--threshold=<ratio>] [--baseline=<filename>]
+           [--save] [<benchmark>...]
+
+Options:
+  --days=<days>         Number of days to generate. [default: 1825]
+  --entries=<n>         Entries per working day. [default: 6]
+  --overlaps=<ratio>    Share of days with overlapping entries. [default: 0.05]
+  --repeat=<n>          Best of how many runs is taken. [default: 5]
+  --threshold=<ratio>   Fail if a benchmark is slower than its baseline by
+                        more than this ratio. [default: 0.5]
+  --baseline=<filename>
+                        Stored baselines. [default: benchmarks/baseline.json]
+  --save                Store results as new baselines.
+
+Baselines depend on the machine, so store them again before comparing on
+another machine.  Results are only compared with baselines recorded with the
+same data parameters.
+
+"""
+
+import os
+import sys
+import json
+import codecs
+import timeit
+import datetime
+
+from io import StringIO
+from types import SimpleNamespace
+from tempfile import TemporaryDirectory
+
+from docopt import docopt
+
+from gtimesheet import timesheet
+from gtimesheet.sync import iter_sync
+from gtimesheet.sync import sync_to_timesheet
+from gtimesheet.sync import SPLIT
+from gtimesheet.timelog import read_timelog
+from gtimesheet.timelog import timelog_items
+from gtimesheet.stats import stats_by_day
+from gtimesheet.overtime import get_overtime
+from gtimesheet.holidays import Holidays
+from gtimesheet.tracker import ReportsLog
+from gtimesheet.tracker import schedule
+from gtimesheet.reports import ReportsFacade
+
+from generate import generate
+from generate import write_timelog
+from generate import write_timesheet_db
+
+MIDNIGHT = '06:00'
+
+
+def setup(path, days, entries_per_day, overlaps):
+    """Generate data and return benchmarks as ``{name: callable}``."""
+    lines, rows = generate(days, entries_per_day, overlaps=overlaps)
+    timelog_path = os.path.join(path, 'timelog.txt')
+    timesheet_path = os.path.join(path, 'timesheet.db')
+    write_timelog(timelog_path, lines)
+    write_timesheet_db(timesheet_path, rows)
+
+    db = timesheet.connect(timesheet_path)
+
+    def run_read_timelog():
+        with codecs.open(timelog_path, encoding='utf-8') as f:
+            return list(read_timelog(f, MIDNIGHT))
+
+    ts1 = list(timesheet.iter_times(db))
+    ts2 = run_read_timelog()
+    merged = list(iter_sync(ts1, ts2, SPLIT))
+    entries = [entry for source, entry in sync_to_timesheet(db, merged)]
+
+    holidays = Holidays([StringIO('*-12-24/3  Christmas\n*-01-01  New year\n')])
+    perday = datetime.timedelta(hours=8)
+
+    last = datetime.datetime.strptime(entries[-1]['date1'], '%Y-%m-%d %H:%M')
+    now = last + datetime.timedelta(days=1)
+
+    # Reports of the last four weeks.
+    cfg = SimpleNamespace(email='team@example.com', name='Me')
+    items = list(timelog_items(entries, MIDNIGHT))
+    since = (now - datetime.timedelta(weeks=4)).strftime('%Y-%m-%d')
+    recent = [entry for entry in entries if entry['date1'] >= since]
+    reports = list(schedule(recent, ReportsLog(now=now), now=now))
+
+    def run_reports():
+        facade = ReportsFacade(cfg, None, datetime.time(6, 0), items=items)
+        return [getattr(facade, report)(date) for report, date in reports]
+
+    return {
+        'read_timelog': run_read_timelog,
+        'iter_sync': lambda: list(iter_sync(ts1, ts2, SPLIT)),
+        'sync_to_timesheet': lambda: list(sync_to_timesheet(db, merged)),
+        'stats_by_day': lambda: list(stats_by_day(entries)),
+        'get_overtime': lambda: get_overtime(entries, perday, holidays),
+        'schedule': lambda: list(schedule(entries, ReportsLog(now=now),
+                                          now=now)),
+        'reports': run_reports,
+    }
+
+
+def load_baseline(filename, params):
+    try:
+        with open(filename) as f:
+            baseline = json.load(f)
+    except (IOError, ValueError):
+        return {}
+    if baseline.get('params') != params:
+        print('Baselines were recorded with %r, not comparing.' %
+              baseline.get('params'))
+        return {}
+    return baseline['timings']
+
+
+def main():
+    args = docopt(__doc__)
+    params = {
+        'days': int(args['--days']),
+        'entries': int(args['--entries']),
+        'overlaps': float(args['--overlaps']),
+    }
+    repeat = int(args['--repeat'])
+    threshold = float(args['--threshold'])
+    baseline = load_baseline(args['--baseline'], params)
+
+    with TemporaryDirectory() as path:
+        benchmarks = setup(path, params['days'], params['entries'],
+                           params['overlaps'])
+        names = args['<benchmark>'] or list(benchmarks)
+        timings = {}
+        regressions = []
+        for name in names:
+            timer = timeit.Timer(benchmarks[name])
+            number, elapsed = timer.autorange()
+            best = min(timer.repeat(repeat, number)) / number
+            timings[name] = best
+            if name in baseline:
+                ratio = best / baseline[name]
+                status = '%+6.0f%%' % ((ratio - 1) * 100)
+                if ratio > 1 + threshold:
+                    status += '  REGRESSION'
+                    regressions.append(name)
+            else:
+                status = ''
+            print('%-20s %8.4f s %s' % (name, best, status))
+
+    if args['--save']:
+        if set(names) != set(benchmarks):
+            timings = dict(baseline, **timings)
+        with open(args['--baseline'], 'w') as f:
+            json.dump({'params': params, 'timings': timings}, f, indent=2,
+                      sort_keys=True)
+            f.write('\n')
+
+    if regressions and not args['--save']:
+        print('Regressed by more than %d%%: %s' % (
+            threshold * 100, ', '.join(regressions),
+        ))
+        return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,164 @@
+"""Compact merged time entry.
+
+Merged entries used to be dicts with 13 keys each.  ``Entry`` stores the
+columns of Timesheet times table in slots instead and shares client and project
+names between entries, but still behaves like a dict, so that entries can be
+used as before.
+
+    >>> entry = Entry({'date1': '2014-03-31 15:48', 'notes': 't2'},
+    ...               projectName='project')
+    >>> entry['date1'], entry.get('breaks', 0)
+    ('2014-03-31 15:48', 0)
+    >>> entry == {'projectName': 'project', 'date1': '2014-03-31 15:48',
+    ...           'notes': 't2'}
+    True
+    >>> entry.update(notes='t3', color='red')
+    >>> sorted(entry.items())
+    [('color', 'red'), ('date1', '2014-03-31 15:48'), ('notes', 't3'), ('projectName', 'project')]
+
+"""
+
+from sys import intern
+from operator import attrgetter
+from operator import itemgetter
+from collections.abc import Mapping
+from collections.abc import MutableMapping
+
+# Columns of times table, see ``timesheet.COLUMNS``.
+FIELDS = (
+    'id',
+    'clientName',
+    'projectName',
+    'project',
+    'amountperhour',
+    'date1',
+    'date2',
+    'working',
+    'breaks',
+    'overtime',
+    'amount',
+    'notes',
+    'methodid',
+    'status',
+)
+
+# Same few values are repeated in all entries, only one copy of each is kept.
+INTERNED = frozenset(['clientName', 'projectName', 'project'])
+
+_FIELDS = frozenset(FIELDS)
+
+_MISSING = object()
+
+
+class Entry(MutableMapping):
+    """Dict like entry, with known columns stored in slots.
+
+    Unset slot means, that there is no such key.  Other keys, for example
+    columns added by newer versions of Timesheet app, are kept in a dict.
+    """
+
+    __slots__ = FIELDS + ('_extra',)
+
+    def __init__(self, *args, **kwargs):
+        self._extra = None
+        self.update(*args, **kwargs)
+
+    def update(self, *args, **kwargs):
+        # Same as MutableMapping.update, but without a method call per key,
+        # this is called for each merged entry.
+        if kwargs:
+            args += (kwargs,)
+        for other in args:
+            if type(other) is Entry:
+                for name in FIELDS:
+                    value = getattr(other, name, _MISSING)
+                    if value is not _MISSING:
+                        setattr(self, name, value)
+                other = other._extra.items() if other._extra else ()
+            elif isinstance(other, (dict, Mapping)):
+                other = other.items()
+            elif hasattr(other, 'keys'):
+                other = ((key, other[key]) for key in other.keys())
+            for key, value in other:
+                if key in _FIELDS:
+                    setattr(self, key, value)
+                else:
+                    if self._extra is None:
+                        self._extra = {}
+                    self._extra[key] = value
+        for name in INTERNED:
+            value = getattr(self, name, None)
+            if type(value) is str:
+                setattr(self, name, intern(value))
+
+    def __getitem__(self, key):
+        if key in _FIELDS:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        if self._extra is None:
+            raise KeyError(key)
+        return self._extra[key]
+
+    def __setitem__(self, key, value):
+        self.update(((key, value),))
+
+    def __delitem__(self, key):
+        if key in _FIELDS:
+            try:
+                delattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        elif self._extra is None:
+            raise KeyError(key)
+        else:
+            del self._extra[key]
+
+    def __contains__(self, key):
+        if key in _FIELDS:
+            return hasattr(self, key)
+        return self._extra is not None and key in self._extra
+
+    def __iter__(self):
+        for name in FIELDS:
+            if hasattr(self, name):
+                yield name
+        if self._extra:
+            yield from self._extra
+
+    def __len__(self):
+        return sum(1 for key in self)
+
+    def __repr__(self):
+        return 'Entry(%r)' % dict(self)
+
+    def copy(self):
+        return Entry(self)
+
+
+def getter(*names):
+    """Return function, which gets given keys of an entry or a dict.
+
+    Faster than ``entry[name]`` for each key in hot loops, since values of an
+    ``Entry`` are taken directly from slots.
+
+        >>> get = getter('date1', 'notes')
+        >>> get(Entry(date1='2014-03-31 15:48', notes='t2'))
+        ('2014-03-31 15:48', 't2')
+        >>> get({'date1': '2014-03-31 15:48', 'notes': 't2'})
+        ('2014-03-31 15:48', 't2')
+
+    """
+    attrs = attrgetter(*names)
+    items = itemgetter(*names)
+
+    def get(entry):
+        if type(entry) is Entry:
+            try:
+                return attrs(entry)
+            except AttributeError:
+                pass
+        return items(entry)
+
+    return get
@@ -41,6 +41,22 @@ Check commented linke:
     >>> holidays.is_holiday(d(2014, 6, 23))
     False
 
+Yearly recurring holidays use ``*`` instead of year:
+
+    >>> holidays = Holidays([StringIO('''
+    ... *-12-24/3     Christmas
+    ... *-02-29       leap day
+    ... ''')])
+    >>> holidays.is_holiday(d(2013, 12, 26))
+    True
+    >>> holidays.is_holiday(d(2020, 2, 28)), holidays.is_holiday(d(2020, 2, 29))
+    (False, True)
+
+Count workdays in a range, end date is not included:
+
+    >>> holidays.workdays(d(2014, 12, 22), d(2014, 12, 29))
+    2
+
 """
 
 import datetime
@@ -50,10 +66,19 @@ DAY = datetime.timedelta(days=1)
 
 
 class Holidays(object):
+    """Holidays calendar.
+
+    Holidays are compiled to a bitmap, one byte per day of whole years, which
+    is extended on demand, when dates outside of it are queried.
+    """
+
     DATE_FORMAT = '%Y-%m-%d'
 
     def __init__(self, files):
         self.holidays = set()
+        self.recurring = set()
+        self.first = None
+        self.bitmap = bytearray()
         for f in files:
             self.from_file(f)
 
@@ -67,17 +92,77 @@ class Holidays(object):
             date = strptime(spec, self.DATE_FORMAT).date()
             return [date]
 
+    def parse_recurring_spec(self, spec):
+        # Year 2000 is a leap year, so *-02-29 is accepted.
+        return [
+            (date.month, date.day)
+            for date in self.parse_date_spec('2000' + spec[1:])
+        ]
+
     def from_file(self, f):
         for line in f:
             line = line.strip()
             if line.startswith('#') or line == '': continue
             date_spec, comment = line.split(None, 1)
-            dates = self.parse_date_spec(date_spec)
-            self.holidays.update(dates)
+            if date_spec.startswith('*'):
+                self.recurring.update(self.parse_recurring_spec(date_spec))
+            else:
+                self.holidays.update(self.parse_date_spec(date_spec))
+        self.first = None
+        self.bitmap = bytearray()
 
     def is_weekday(self, date):
         return date.isoweekday() in (6, 7)
 
+    def compile(self, start, end):
+        """Build bitmap of all years from start to end date."""
+        first = datetime.date(start.year, 1, 1).toordinal()
+        last = datetime.date(end.year + 1, 1, 1).toordinal()
+        bitmap = bytearray(last - first)
+
+        # Ordinal 6 is Saturday and ordinal 7 is Sunday.
+        for weekend in (6, 7):
+            i = (weekend - first) % 7
+            bitmap[i::7] = b'\x01' * len(range(i, len(bitmap), 7))
+
+        for date in self.holidays:
+            if first <= date.toordinal() < last:
+                bitmap[date.toordinal() - first] = 1
+
+        for year in range(start.year, end.year + 1):
+            for month, day in self.recurring:
+                try:
+                    date = datetime.date(year, month, day)
+                except ValueError:
+                    continue
+                bitmap[date.toordinal() - first] = 1
+
+        self.first = first
+        self.bitmap = bitmap
+
+    def _ensure(self, start, end):
+        if self.first is None:
+            self.compile(start, end)
+            return
+        first = datetime.date.fromordinal(self.first)
+        last = datetime.date.fromordinal(self.first + len(self.bitmap) - 1)
+        if start < first or end > last:
+            self.compile(min(start, first), max(end, last))
+
+    def mask(self, start, end):
+        """Return holidays bitmap of days from start to end date (excluded)."""
+        if end <= start:
+            return bytearray()
+        self._ensure(start, end - DAY)
+        i = start.toordinal() - self.first
+        return self.bitmap[i:i + (end - start).days]
+
+    def workdays(self, start, end):
+        """Count workdays from start to end date (excluded)."""
+        mask = self.mask(start, end)
+        return len(mask) - mask.count(1)
+
     def is_holiday(self, date):
         date = date.date() if isinstance(date, datetime.datetime) else date
-        return self.is_weekday(date) or date in self.holidays
+        self._ensure(date, date)
+        return self.bitmap[date.toordinal() - self.first] == 1
@@ -0,0 +1,145 @@
+"""Sidecar index of day offsets in timelog.txt.
+
+gtimelog only appends to timelog.txt, so instead of reading the whole file on
+every run, we keep a small index next to it, which maps each virtual-midnight
+day to the byte offset of the first line of that day.  The index remembers
+the size and mtime of the file it was built from, and only the appended tail
+is indexed on the next run.
+
+"""
+
+import os
+import json
+import bisect
+import datetime
+
+from .timelog import parse_line
+
+INDEX_SUFFIX = '.idx'
+
+
+def virtual_day(time, midnight):
+    """Return the day, that given time belongs to.
+
+    >>> virtual_day(datetime.datetime(2014, 3, 25, 9, 0), '06:00')
+    datetime.date(2014, 3, 25)
+
+    >>> virtual_day(datetime.datetime(2014, 3, 25, 2, 0), '06:00')
+    datetime.date(2014, 3, 24)
+
+    """
+    hour, minute = map(int, midnight.split(':'))
+    if time.time() < datetime.time(hour, minute):
+        return time.date() - datetime.timedelta(days=1)
+    else:
+        return time.date()
+
+
+class TimelogIndex(object):
+
+    def __init__(self, filename, midnight='06:00', index_filename=None):
+        self.filename = str(filename)
+        self.index_filename = index_filename or self.filename + INDEX_SUFFIX
+        self.midnight = midnight
+        self.size = 0
+        self.mtime = None
+        self.days = []
+        self.offsets = []
+
+    def load(self):
+        try:
+            with open(self.index_filename) as f:
+                data = json.load(f)
+        except (IOError, ValueError):
+            return False
+        if data.get('midnight') != self.midnight:
+            return False
+        self.size = data['size']
+        self.mtime = data['mtime']
+        self.days = [day for day, offset in data['days']]
+        self.offsets = [offset for day, offset in data['days']]
+        return True
+
+    def save(self):
+        data = {
+            'size': self.size,
+            'mtime': self.mtime,
+            'midnight': self.midnight,
+            'days': list(zip(self.days, self.offsets)),
+        }
+        with open(self.index_filename, 'w') as f:
+            json.dump(data, f)
+
+    def reset(self):
+        self.size = 0
+        self.mtime = None
+        self.days = []
+        self.offsets = []
+
+    def is_appended(self, f, stat):
+        """Check if file was only appended since the index was built."""
+        if stat.st_size < self.size:
+            return False
+        if stat.st_size == self.size:
+            return stat.st_mtime == self.mtime
+        if self.size > 0:
+            f.seek(self.size - 1)
+            if f.read(1) != b'\n':
+                return False
+        if self.days:
+            f.seek(self.offsets[-1])
+            if not f.read(10).startswith(self.days[-1].encode('ascii')):
+                return False
+        return True
+
+    def update(self):
+        """Load index and bring it up to date with the timelog file.
+
+        Returns the index itself, so that it can be chained.
+        """
+        self.load()
+        with open(self.filename, 'rb') as f:
+            stat = os.fstat(f.fileno())
+            if stat.st_size == self.size and stat.st_mtime == self.mtime:
+                return self
+            if not self.is_appended(f, stat):
+                self.reset()
+            self.index(f, self.size)
+            self.mtime = stat.st_mtime
+        self.save()
+        return self
+
+    def index(self, f, offset):
+        last = self.days[-1] if self.days else None
+        f.seek(offset)
+        for line in f:
+            if not line.endswith(b'\n'):
+                # Line is still being written, index it on next run.
+                break
+            start = offset
+            offset += len(line)
+            line = line.decode('utf-8').strip()
+            if line == '':
+                continue
+            try:
+                time, note = parse_line(line)
+            except ValueError:
+                continue
+            day = virtual_day(time, self.midnight).isoformat()
+            if last is None or day > last:
+                self.days.append(day)
+                self.offsets.append(start)
+                last = day
+        self.size = offset
+
+    def offset(self, date):
+        """Byte offset of the first line of the first day on or after date."""
+        if isinstance(date, datetime.datetime):
+            date = virtual_day(date, self.midnight)
+        if isinstance(date, datetime.date):
+            date = date.isoformat()
+        i = bisect.bisect_left(self.days, date)
+        if i < len(self.offsets):
+            return self.offsets[i]
+        else:
+            return self.size
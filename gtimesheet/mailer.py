@@ -1,8 +1,11 @@
 import os
+import time
 import codecs
 import smtplib
 import email
+import collections
 
+from concurrent.futures import ThreadPoolExecutor
 from getpass import getpass
 from subprocess import call
 from tempfile import NamedTemporaryFile
@@ -12,7 +15,18 @@ from contextlib import contextmanager
 
 from .tracker import schedule
 from .reports import ReportsFacade
+from .timelog import timelog_items
 from .utils import is_empty_iterable
+from .profiling import profiler
+from .metrics import metrics
+
+# How many reports are rendered ahead of the one shown to the user.
+PREFETCH = 3
+
+# How many times batch mode retries transient SMTP failures, and how many
+# seconds it waits before first retry (doubled after each failed attempt).
+RETRIES = 3
+BACKOFF = 2
 
 
 def sendmail(server, from_, to, message):
@@ -29,30 +43,143 @@ def sendmail(server, from_, to, message):
     server.sendmail(from_, to, msg.as_string())
 
 
+class PasswordRequired(Exception):
+    """SMTP password is not configured and can not be asked for."""
+
+
+class Session(object):
+    """Authenticated SMTP session, that can be reopened if it drops.
+
+    In batch mode password is never asked for.
+    """
+
+    def __init__(self, cfg, factory=smtplib.SMTP, batch=False):
+        self.cfg = cfg
+        self.factory = factory
+        self.batch = batch
+        self.password = cfg.smtp_password
+        self.server = None
+
+    def connect(self):
+        cfg = self.cfg
+        ask_password = cfg.smtp_ask_password and not self.password
+        if ask_password and self.batch:
+            raise PasswordRequired(
+                'SMTP password for %s is not configured, set smtp-password '
+                'to send reports in batch mode.' % cfg.smtp_username
+            )
+
+        server = self.factory(cfg.smtp_server, cfg.smtp_port)
+        try:
+            self.login(server, ask_password)
+        except BaseException:
+            server.close()
+            raise
+        self.server = server
+        return server
+
+    def login(self, server, ask_password):
+        cfg = self.cfg
+        server.ehlo()
+        server.starttls()
+
+        if ask_password:
+            for i in range(3):
+                password = getpass('Enter SMTP password for %s: ' %
+                                   cfg.smtp_username)
+                try:
+                    server.login(cfg.smtp_username, password)
+                except smtplib.SMTPAuthenticationError:
+                    print()
+                    print('Incorrect password, try again...')
+                else:
+                    self.password = password
+                    break
+        else:
+            server.login(cfg.smtp_username, self.password)
+
+    def sendmail(self, from_, to, message):
+        if self.server is None:
+            self.connect()
+        try:
+            sendmail(self.server, from_, to, message)
+        except smtplib.SMTPServerDisconnected:
+            self.server = None
+            raise
+
+    def close(self):
+        if self.server is not None:
+            try:
+                self.server.close()
+            finally:
+                self.server = None
+
+
+@contextmanager
+def smtp_session(cfg, factory=smtplib.SMTP, batch=False, retries=RETRIES,
+                 backoff=BACKOFF, sleep=time.sleep):
+    """Open SMTP session, retrying transient failures with backoff."""
+    session = Session(cfg, factory, batch)
+    delay = backoff
+    for attempt in range(retries + 1):
+        try:
+            with profiler.stage('smtp'), metrics.time(
+                'gtimesheet_smtp_seconds', operation='connect',
+            ):
+                session.connect()
+        except Exception as e:
+            if attempt == retries or not is_transient(e):
+                raise
+            print('Connecting to %s: %s, retrying in %d s ...' % (
+                cfg.smtp_server, e, delay,
+            ))
+            sleep(delay)
+            delay *= 2
+        else:
+            break
+    try:
+        yield session
+    finally:
+        session.close()
+
+
 @contextmanager
 def smtp(cfg):
+    with smtp_session(cfg) as session:
+        yield session.server
 
-    server = smtplib.SMTP(cfg.smtp_server, cfg.smtp_port)
-    server.ehlo()
-    server.starttls()
 
-    if cfg.smtp_ask_password:
-        for i in range(3):
-            password = getpass('Enter SMTP password for %s: ' %
-                               cfg.smtp_username)
-            try:
-                server.login(cfg.smtp_username, password)
-            except smtplib.SMTPAuthenticationError:
-                print()
-                print('Incorrect password, try again...')
-            else:
-                break
+def is_transient(error):
+    """Check if sending can be retried after given error.
+
+        >>> is_transient(smtplib.SMTPServerDisconnected())
+        True
+        >>> is_transient(smtplib.SMTPDataError(451, 'Try again later'))
+        True
+        >>> is_transient(smtplib.SMTPDataError(550, 'Mailbox unavailable'))
+        False
+        >>> is_transient(ConnectionResetError())
+        True
+
+    """
+    if isinstance(error, smtplib.SMTPServerDisconnected):
+        return True
+    elif isinstance(error, smtplib.SMTPResponseException):
+        return 400 <= error.smtp_code < 500
+    elif isinstance(error, smtplib.SMTPException):
+        return False
     else:
-        server.login(cfg.smtp_username, cfg.smtp_password)
+        return isinstance(error, OSError)
 
-    yield server
 
-    server.close()
+def count_report(state, report):
+    metrics.inc('gtimesheet_reports_total', state=state, report=report)
+
+
+def counted_reports(state, reports):
+    for item in reports:
+        count_report(state, item[0])
+        yield item
 
 
 def print_email_preview(body):
@@ -63,10 +190,53 @@ def print_email_preview(body):
     print()
 
 
+def prefetch_reports(reports, entries, ahead=PREFETCH):
+    """Render reports in background thread, few ahead of the current one.
+
+    Yields ``(report, date, body)`` in the same order as given entries.
+
+        >>> class Reports(object):
+        ...     def daily(self, date):
+        ...         return 'daily %s' % date
+        ...     def weekly(self, date):
+        ...         return 'weekly %s' % date
+
+        >>> entries = [('daily', '2014-03-30'), ('weekly', '2014/13'),
+        ...            ('daily', '2014-03-31')]
+        >>> for report in prefetch_reports(Reports(), entries, ahead=1):
+        ...     print(report)
+        ('daily', '2014-03-30', 'daily 2014-03-30')
+        ('weekly', '2014/13', 'weekly 2014/13')
+        ('daily', '2014-03-31', 'daily 2014-03-31')
+
+    """
+    executor = ThreadPoolExecutor(max_workers=1)
+    pending = collections.deque()
+    entries = iter(entries)
+    try:
+        while True:
+            while len(pending) <= ahead:
+                entry = next(entries, None)
+                if entry is None:
+                    break
+                report, date = entry
+                genreport = getattr(reports, report)
+                pending.append((report, date, executor.submit(genreport, date)))
+
+            if not pending:
+                break
+
+            report, date, body = pending.popleft()
+            yield report, date, body.result()
+    finally:
+        for report, date, body in pending:
+            body.cancel()
+        executor.shutdown(wait=False)
+
+
 def _send_reports(cfg, server, entries, reports, replog):
-    for report, date in entries:
-        genreport = getattr(reports, report)
-        body = genreport(date)
+    rendered = counted_reports('rendered', prefetch_reports(reports, entries))
+    for report, date, body in profiler.iterate('render', rendered):
         print_email_preview(body)
 
         while True:
@@ -79,12 +249,17 @@ def _send_reports(cfg, server, entries, reports, replog):
                     print('  DONE (dry-run)')
                     break
                 try:
-                    sendmail(server, cfg.from_email, cfg.email, body)
+                    with profiler.stage('smtp'), metrics.time(
+                        'gtimesheet_smtp_seconds', operation='send',
+                    ):
+                        sendmail(server, cfg.from_email, cfg.email, body)
                 except Exception as e:
+                    count_report('failed', report)
                     print('FAILED.')
                     print('Failed to send email: %s' % e)
                     raise
                 else:
+                    count_report('sent', report)
                     print('  DONE')
                     replog.write(report, date)
                 break
@@ -106,10 +281,12 @@ def _send_reports(cfg, server, entries, reports, replog):
 
             elif answer == 'n':
                 print('Skipping this report.')
+                count_report('skipped', report)
                 replog.write(report, date)
                 break
 
             elif answer == 'q':
+                rendered.close()
                 return
 
             else:
@@ -127,12 +304,65 @@ def _send_reports(cfg, server, entries, reports, replog):
                 print()
 
 
-def send_reports(cfg, filename, entries, replog, dontsend=False):
-    reports = ReportsFacade(cfg, filename, cfg.virtual_midnight)
-    entries = schedule(entries, replog)
+def _batch_send_report(cfg, session, report, date, body, replog,
+                       retries=RETRIES, backoff=BACKOFF, sleep=time.sleep):
+    """Send single report, retrying transient failures with backoff."""
+    delay = backoff
+    for attempt in range(retries + 1):
+        try:
+            with profiler.stage('smtp'), metrics.time(
+                'gtimesheet_smtp_seconds', operation='send',
+            ):
+                session.sendmail(cfg.from_email, cfg.email, body)
+        except Exception as e:
+            if attempt == retries or not is_transient(e):
+                count_report('failed', report)
+                print('%s %s: FAILED (%s)' % (report, date, e))
+                return False
+            print('%s %s: %s, retrying in %d s ...' % (report, date, e, delay))
+            session.close()
+            sleep(delay)
+            delay *= 2
+        else:
+            count_report('sent', report)
+            replog.write(report, date)
+            print('%s %s: DONE' % (report, date))
+            return True
+
+
+def _batch_send_reports(cfg, session, entries, reports, replog, **kwargs):
+    """Send all reports without asking, returns number of failed reports."""
+    failed = 0
+    rendered = counted_reports('rendered', prefetch_reports(reports, entries))
+    for report, date, body in profiler.iterate('render', rendered):
+        if session is None:
+            print('%s %s: DONE (dry-run)' % (report, date))
+        elif not _batch_send_report(cfg, session, report, date, body, replog,
+                                    **kwargs):
+            failed += 1
+    return failed
+
+
+def send_reports(cfg, entries, replog, dontsend=False, batch=False):
+    midnight = cfg.virtual_midnight.strftime('%H:%M')
+    items = timelog_items(entries, midnight)
+    reports = ReportsFacade(cfg, None, cfg.virtual_midnight, items=items)
+    entries = profiler.iterate('schedule', schedule(entries, replog))
+    entries = counted_reports('scheduled', entries)
     entries = is_empty_iterable(entries)
     if entries is None:
         print('No reports to be sent.')
+    elif batch:
+        if cfg.dry_run:
+            return _batch_send_reports(cfg, None, entries, reports, replog)
+        else:
+            try:
+                with smtp_session(cfg, batch=True) as session:
+                    return _batch_send_reports(cfg, session, entries,
+                                               reports, replog)
+            except PasswordRequired as e:
+                print(e)
+                return sum(1 for entry in entries)
     else:
         if cfg.dry_run:
             server = None
@@ -0,0 +1,188 @@
+"""Run metrics, written to a Prometheus textfile or JSON file.
+
+Metrics are collected only when enabled, otherwise all calls do nothing.  At
+the end of a run the file is replaced atomically, so that it can be read by
+node_exporter textfile collector at any time.
+
+    >>> metrics = Metrics()
+    >>> metrics.counter('reports_total', 'Reports by state.')
+    >>> metrics.histogram('smtp_seconds', 'SMTP latency.', [0.5, 1])
+    >>> metrics.enable()
+    >>> metrics.inc('reports_total', state='sent')
+    >>> metrics.inc('reports_total', 2, state='sent')
+    >>> metrics.observe('smtp_seconds', 0.7)
+    >>> print(metrics.to_prometheus(), end='')
+    # HELP reports_total Reports by state.
+    # TYPE reports_total counter
+    reports_total{state="sent"} 3
+    # HELP smtp_seconds SMTP latency.
+    # TYPE smtp_seconds histogram
+    smtp_seconds_bucket{le="0.5"} 0
+    smtp_seconds_bucket{le="1"} 1
+    smtp_seconds_bucket{le="+Inf"} 1
+    smtp_seconds_sum 0.7
+    smtp_seconds_count 1
+
+"""
+
+import json
+import time
+import bisect
+import collections
+
+from contextlib import contextmanager
+
+from .utils import atomic_write
+
+SMTP_BUCKETS = [0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30]
+
+
+def format_labels(labels, **extra):
+    labels = sorted(labels + tuple(extra.items()))
+    if not labels:
+        return ''
+    return '{%s}' % ','.join('%s="%s"' % label for label in labels)
+
+
+def format_value(value):
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Metrics(object):
+
+    def __init__(self):
+        self.enabled = False
+        self.types = collections.OrderedDict()
+        self.values = collections.OrderedDict()
+
+    def enable(self):
+        self.enabled = True
+
+    def _declare(self, name, type, help, buckets=None):
+        self.types[name] = type, help, buckets
+        self.values[name] = collections.OrderedDict()
+
+    def counter(self, name, help):
+        self._declare(name, 'counter', help)
+
+    def gauge(self, name, help):
+        self._declare(name, 'gauge', help)
+
+    def histogram(self, name, help, buckets):
+        self._declare(name, 'histogram', help, sorted(buckets))
+
+    def inc(self, name, value=1, **labels):
+        if self.enabled and value:
+            labels = tuple(sorted(labels.items()))
+            values = self.values[name]
+            values[labels] = values.get(labels, 0) + value
+
+    def set(self, name, value, **labels):
+        if self.enabled:
+            self.values[name][tuple(sorted(labels.items()))] = value
+
+    def observe(self, name, value, **labels):
+        if not self.enabled:
+            return
+        labels = tuple(sorted(labels.items()))
+        buckets = self.types[name][2]
+        values = self.values[name]
+        if labels not in values:
+            # [count per bucket, sum, count]
+            values[labels] = [[0] * len(buckets), 0.0, 0]
+        histogram = values[labels]
+        i = bisect.bisect_left(buckets, value)
+        if i < len(buckets):
+            histogram[0][i] += 1
+        histogram[1] += value
+        histogram[2] += 1
+
+    @contextmanager
+    def time(self, name, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def to_prometheus(self):
+        lines = []
+        for name, (type, help, buckets) in self.types.items():
+            values = self.values[name]
+            if not values:
+                continue
+            lines.append('# HELP %s %s' % (name, help))
+            lines.append('# TYPE %s %s' % (name, type))
+            for labels, value in values.items():
+                if type != 'histogram':
+                    lines.append('%s%s %s' % (
+                        name, format_labels(labels), format_value(value),
+                    ))
+                    continue
+                counts, total, count = value
+                cumulative = 0
+                for le, n in zip(buckets, counts):
+                    cumulative += n
+                    lines.append('%s_bucket%s %d' % (
+                        name, format_labels(labels, le=format_value(le)),
+                        cumulative,
+                    ))
+                lines.append('%s_bucket%s %d' % (
+                    name, format_labels(labels, le='+Inf'), count,
+                ))
+                lines.append('%s_sum%s %s' % (
+                    name, format_labels(labels), format_value(total),
+                ))
+                lines.append('%s_count%s %d' % (
+                    name, format_labels(labels), count,
+                ))
+        return ''.join(line + '\n' for line in lines)
+
+    def to_json(self):
+        data = {}
+        for name, (type, help, buckets) in self.types.items():
+            samples = []
+            for labels, value in self.values[name].items():
+                sample = {'labels': dict(labels)}
+                if type == 'histogram':
+                    counts, total, count = value
+                    sample.update(buckets=list(zip(buckets, counts)),
+                                  sum=total, count=count)
+                else:
+                    sample['value'] = value
+                samples.append(sample)
+            if samples:
+                data[name] = {'type': type, 'help': help, 'samples': samples}
+        return data
+
+    def write(self, filename):
+        """Write metrics as JSON, if filename ends with .json, else as
+        Prometheus textfile."""
+        filename = str(filename)
+        if filename.endswith('.json'):
+            content = json.dumps(self.to_json(), indent=2, sort_keys=True)
+        else:
+            content = self.to_prometheus()
+        with atomic_write(filename) as f:
+            f.write(content)
+
+    def collect_stages(self, profiler):
+        for name, stage in profiler.stages.items():
+            self.set('gtimesheet_stage_seconds', stage.wall, stage=name)
+            self.set('gtimesheet_stage_cpu_seconds', stage.cpu, stage=name)
+            if stage.count is not None:
+                self.set('gtimesheet_stage_items', stage.count, stage=name)
+
+
+metrics = Metrics()
+metrics.counter('gtimesheet_timelog_lines_total', 'Timelog lines parsed.')
+metrics.counter('gtimesheet_entries_total', 'Merged entries by source.')
+metrics.counter('gtimesheet_reports_total', 'Reports by state and type.')
+metrics.histogram('gtimesheet_smtp_seconds', 'SMTP operation latency.',
+                  SMTP_BUCKETS)
+metrics.gauge('gtimesheet_stage_seconds', 'Wall-clock time of each stage.')
+metrics.gauge('gtimesheet_stage_cpu_seconds', 'CPU time of each stage.')
+metrics.gauge('gtimesheet_stage_items', 'Items processed by each stage.')
+metrics.gauge('gtimesheet_run_seconds', 'Wall-clock time of the whole run.')
+metrics.gauge('gtimesheet_run_exit_code', 'Exit code of the run.')
+metrics.gauge('gtimesheet_run_timestamp_seconds', 'When the run finished.')
@@ -1,59 +1,76 @@
 import datetime
 
-import matplotlib.pyplot as plt
-import matplotlib.dates as mdates
+import numpy as np
 
 import gtimesheet.stats
 
 
-def get_overtime(entries, perday, holidays):
-    totaltime = datetime.timedelta()
-    worktime = datetime.timedelta()
-    overtime = datetime.timedelta()
-    for date, time in gtimesheet.stats.stats_by_day(entries):
-        totaltime += perday
-        worktime += time
-        if holidays.is_holiday(date):
-            overtime += time
-            continue
-
-        if time > perday:
-            overtime += time - perday
-        else:
-            overtime -= perday - time
+def holiday_mask(days, holidays):
+    """Return holidays mask of consecutive days array."""
+    if not len(days):
+        return np.array([], dtype=bool)
+    start = days[0].astype(object)
+    mask = holidays.mask(start, start + datetime.timedelta(days=len(days)))
+    return np.frombuffer(bytes(mask), dtype=np.uint8).astype(bool)
+
+
+def overtime_by_day(entries, perday, holidays):
+    """Compute overtime of each day.
+
+    Returns ``(days, minutes, holiday, overtime)`` arrays, where ``minutes``
+    are work minutes of each day, ``holiday`` is a mask of holidays and
+    ``overtime`` is cumulative overtime in seconds at the end of each day.
+    On holidays all work time is overtime.
+    """
+    days, minutes = gtimesheet.stats.day_totals(entries)
+    holiday = holiday_mask(days, holidays)
+    seconds = minutes * 60.0
+    overtime = np.where(holiday, seconds, seconds - perday.total_seconds())
+    return days, minutes, holiday, np.cumsum(overtime)
+
 
+def overtime_summary(perday, days, minutes, holiday, overtime):
+    """Return ``(totaltime, worktime, overtime)`` of ``overtime_by_day``."""
+    totaltime = perday * len(days)
+    worktime = datetime.timedelta(minutes=int(minutes.sum()))
+    if len(days):
+        overtime = datetime.timedelta(seconds=float(overtime[-1]))
+    else:
+        overtime = datetime.timedelta()
     return totaltime, worktime, overtime
 
+
+def get_overtime(entries, perday, holidays):
+    return overtime_summary(perday, *overtime_by_day(entries, perday,
+                                                     holidays))
+
 def td_to_hours(delta):
     delta = delta.total_seconds()
     hours, delta = divmod(delta, 60*60)
     return hours
 
 
-
-def overtime_graph(entries, perday, holidays):
-    x = []
-    y = []
-
-    overtime = datetime.timedelta()
-    for date, time in gtimesheet.stats.stats_by_day(entries):
-        x.append(date.date())
-        if holidays.is_holiday(date):
-            overtime += time
-        else:
-            if time > perday:
-                overtime += time - perday
-            else:
-                overtime -= perday - time
-
+def print_overtime(perday, days, minutes, holiday, overtime):
+    """Print overtime hours, work hours and hours per day of each day."""
+    y = (overtime // (60*60)).tolist()
+    for date, time, is_holiday, hours in zip(days.astype(object),
+                                             minutes.tolist(), holiday, y):
         print('%s: %6s %6s %6s %s' % (
-            date.date(),
-            td_to_hours(overtime),
-            td_to_hours(time),
+            date,
+            hours,
+            td_to_hours(datetime.timedelta(minutes=time)),
             td_to_hours(perday),
-            'holiday' if holidays.is_holiday(date) else '',
+            'holiday' if is_holiday else '',
         ))
-        y.append(td_to_hours(overtime))
+
+
+def plot_overtime(days, overtime):
+    # matplotlib takes long to import, so it is imported only when needed.
+    import matplotlib.pyplot as plt
+    import matplotlib.dates as mdates
+
+    x = days.astype(object)
+    y = (overtime // (60*60)).tolist()
 
     fig, ax = plt.subplots(1)
     ax.plot(x, [0] * len(x), 'k')
@@ -63,3 +80,10 @@ def overtime_graph(entries, perday, holidays):
     fig.autofmt_xdate()
     plt.grid()
     plt.show()
+
+
+def overtime_graph(entries, perday, holidays):
+    days, minutes, holiday, overtime = overtime_by_day(entries, perday,
+                                                       holidays)
+    print_overtime(perday, days, minutes, holiday, overtime)
+    plot_overtime(days, overtime)
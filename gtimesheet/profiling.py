@@ -0,0 +1,112 @@
+"""Per-stage wall-clock and CPU timings.
+
+Most of the work is done lazily by chained generators, so stages are timed by
+wrapping iterators: time spent in ``next()`` of a stage is counted for that
+stage, minus time spent in nested stages.  The profiler is disabled by
+default, then iterators are returned unchanged.
+
+    >>> profiler = Profiler()
+    >>> profiler.enable()
+    >>> items = profiler.iterate('double', (x * 2 for x in
+    ...                                     profiler.iterate('read', range(3))))
+    >>> list(items)
+    [0, 2, 4]
+    >>> with profiler.stage('config'):
+    ...     pass
+    >>> [(name, stage.count) for name, stage in profiler.stages.items()]
+    [('read', 3), ('double', 3), ('config', None)]
+
+"""
+
+import sys
+import time
+import collections
+
+from contextlib import contextmanager
+
+
+class Stage(object):
+    def __init__(self):
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.count = None
+
+
+class Profiler(object):
+
+    def __init__(self):
+        self.enabled = False
+        self.stages = collections.OrderedDict()
+        self.stack = []
+        self.started = None
+
+    def enable(self):
+        self.enabled = True
+        self.started = time.perf_counter(), time.process_time()
+
+    def _enter(self, name):
+        self.stages.setdefault(name, Stage())
+        # [name, wall, cpu, nested wall, nested cpu]
+        self.stack.append([name, time.perf_counter(), time.process_time(),
+                           0.0, 0.0])
+
+    def _exit(self, count=0):
+        name, wall, cpu, nested_wall, nested_cpu = self.stack.pop()
+        wall = time.perf_counter() - wall
+        cpu = time.process_time() - cpu
+        stage = self.stages[name]
+        stage.wall += wall - nested_wall
+        stage.cpu += cpu - nested_cpu
+        if count:
+            stage.count = (stage.count or 0) + count
+        if self.stack:
+            self.stack[-1][3] += wall
+            self.stack[-1][4] += cpu
+
+    @contextmanager
+    def stage(self, name):
+        if not self.enabled:
+            yield
+            return
+        self._enter(name)
+        try:
+            yield
+        finally:
+            self._exit()
+
+    def iterate(self, name, iterable):
+        """Count time spent getting items from iterable and number of items."""
+        if not self.enabled:
+            return iterable
+        stage = self.stages.setdefault(name, Stage())
+        stage.count = stage.count or 0
+        return self._iterate(name, iter(iterable))
+
+    def _iterate(self, name, iterator):
+        while True:
+            self._enter(name)
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self._exit()
+                return
+            except BaseException:
+                self._exit()
+                raise
+            self._exit(1)
+            yield item
+
+    def report(self, f=sys.stderr):
+        wall = time.perf_counter() - self.started[0]
+        cpu = time.process_time() - self.started[1]
+        print('%-20s %9s %9s %9s' % ('stage', 'wall s', 'cpu s', 'items'),
+              file=f)
+        for name, stage in self.stages.items():
+            print('%-20s %9.4f %9.4f %9s' % (
+                name, stage.wall, stage.cpu,
+                '-' if stage.count is None else stage.count,
+            ), file=f)
+        print('%-20s %9.4f %9.4f' % ('total', wall, cpu), file=f)
+
+
+profiler = Profiler()
@@ -37,6 +37,18 @@ Daily report test.
     ...
     <BLANKLINE>
 
+Time log is parsed only once, other reports are cut from parsed items.
+
+    >>> items = reports.items
+    >>> print(reports.daily('2014-03-24')) # doctest: +ELLIPSIS
+    To: me@example.com
+    ...
+    Total work done: 3 hours 59 min
+    ...
+    <BLANKLINE>
+    >>> reports.items is items
+    True
+
 
 Weekly report test.
 
@@ -61,6 +73,20 @@ Monthly report test.
     <BLANKLINE>
 
 
+Reports can be generated from time log items, without reading any file.
+
+    >>> from .timelog import timelog_items
+    >>> reports = ReportsFacade(cfg, None, items=timelog_items([
+    ...     {'date1': '2014-03-31 15:48', 'date2': '2014-03-31 17:10',
+    ...      'breaks': 0, 'projectName': 'project', 'notes': 'task 2'},
+    ... ]))
+    >>> print(reports.daily('2014-03-31')) # doctest: +ELLIPSIS
+    To: me@example.com
+    ...
+    Total work done: 1 hour 22 min
+    ...
+    <BLANKLINE>
+
 Tear down tests.
 
     >>> os.unlink(f.name)
@@ -83,27 +109,55 @@ Test weekly report issue on first week of the year, caused by:
 """
 
 import arrow
+import bisect
 import datetime
 import isoweek
 
 from io import StringIO
+from operator import itemgetter
 
 from gtimelog.timelog import Reports
 from gtimelog.timelog import TimeLog
 from gtimelog.timelog import TimeWindow
 
 
+class TimeSlice(object):
+    """Sorted part of time log items, that TimeWindow can be cut from."""
+
+    def __init__(self, items, virtual_midnight):
+        self.items = items
+        self.virtual_midnight = virtual_midnight
+
+
 class ReportsFacade(object):
 
-    def __init__(self, cfg, filename, virtual_midnight=datetime.time(6, 0)):
+    def __init__(self, cfg, filename, virtual_midnight=datetime.time(6, 0),
+                 items=None):
         self.filename = filename
         self.virtual_midnight = virtual_midnight
         self.email = cfg.email
         self.who = cfg.name
+        self.items = None
+        self.times = None
+        if items is not None:
+            self.set_items(items)
 
-    def window(self, min_dt, max_dt):
+    def set_items(self, items):
+        self.items = sorted(items, key=itemgetter(0))
+        self.times = [time for time, entry in self.items]
+
+    def load(self):
+        """Parse time log once and keep its items sorted by time."""
         tl = TimeLog(self.filename, self.virtual_midnight)
-        return TimeWindow(tl, min_dt, max_dt, )
+        self.set_items(tl.items)
+
+    def window(self, min_dt, max_dt):
+        if self.items is None:
+            self.load()
+        lo = bisect.bisect_left(self.times, min_dt)
+        hi = bisect.bisect_left(self.times, max_dt, lo)
+        items = TimeSlice(self.items[lo:hi], self.virtual_midnight)
+        return TimeWindow(items, min_dt, max_dt)
 
     def report(self, method, window):
         output = StringIO()
@@ -19,6 +19,10 @@ def resolve_path(path):
     return Path(expanduser(path)).resolve()
 
 
+def resolve_optional_path(path):
+    return resolve_path(path) if path else None
+
+
 def resolve_float(s):
     if s is None:
         return None
@@ -56,6 +60,14 @@ def resolve_list(*apply):
     return _resolve_list
 
 
+def resolve_choice(*choices):
+    def _resolve_choice(s):
+        if s is not None and s not in choices:
+            raise ValueError('%r is not one of: %s' % (s, ', '.join(choices)))
+        return s
+    return _resolve_choice
+
+
 class Settings(object):
     def load(self, args):
         config = RawConfigParser()
@@ -90,6 +102,17 @@ class Settings(object):
             apply=resolve_path,
         )
 
+        self.set('sync_state',
+            gsheet.get('sync-state'),
+            '~/.gtimelog/gtimesheet-sync.json',
+            apply=resolve_path,
+        )
+
+        self.set('metrics_file',
+            gsheet.get('metrics-file'),
+            apply=resolve_optional_path,
+        )
+
         self.set('holidays',
             args['--holidays'],
             gsheet.get('holidays'),
@@ -124,6 +147,21 @@ class Settings(object):
 
         self.set('dry_run', args['--dry-run'], apply=bool)
         self.set('fake', args['--fake'], apply=bool)
+        self.set('batch', args['--batch'], apply=bool)
+        self.set('incremental', args['--incremental'], apply=bool)
+        self.set('write', args['--write'], apply=bool)
+        self.set('update', args['--update'], apply=bool)
+        self.set('watch_interval',
+            args['--interval'],
+            gsheet.get('watch-interval'),
+            2,
+            apply=resolve_float,
+        )
+        self.set('resolve',
+            args['--resolve'],
+            gsheet.get('resolve'),
+            apply=resolve_choice('timesheet', 'timelog', 'split'),
+        )
         self.set('email', args['--email'], glog.get('list-email'))
         self.set('from_email', args['--from-email'], gsheet.get('from-email'))
         self.set('name', args['--name'], glog.get('name'))
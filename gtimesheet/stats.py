@@ -1,9 +1,20 @@
 import datetime
+import itertools
+
+import numpy as np
 
 from .constants import VIRTUAL_MIDNIGHT
+from .entry import getter
 
 combine = datetime.datetime.combine
 
+MINUTES_PER_DAY = 24 * 60
+
+# Number of entries converted to arrays at once.
+CHUNK_SIZE = 4096
+
+_fields = getter('notes', 'date1', 'date2', 'breaks')
+
 
 def format_stats(stats):
     fmt = '%Y-%m-%d'
@@ -11,6 +22,90 @@ def format_stats(stats):
         yield date.strftime(fmt), str(time)
 
 
+def _chunk_totals(chunk, midnight):
+    """Return virtual day numbers and work minutes of counted entries."""
+    date1 = []
+    date2 = []
+    breaks = []
+    for entry in chunk:
+        notes, start, end, pause = _fields(entry)
+        if notes.endswith('*'): continue
+        date1.append(start)
+        date2.append(end)
+        breaks.append(pause or 0)
+
+    start = np.array(date1, dtype='datetime64[m]').astype(np.int64)
+    end = np.array(date2, dtype='datetime64[m]').astype(np.int64)
+    end -= np.array(breaks, dtype=np.int64)
+
+    # Entries started at or before virtual midnight belong to previous day.
+    day = (start - midnight - 1) // MINUTES_PER_DAY
+    return day, end - start
+
+
+def day_totals(entries, virtual_midnight=VIRTUAL_MIDNIGHT,
+               chunk_size=CHUNK_SIZE):
+    """Sum up work time of each virtual day.
+
+    Entries are consumed in chunks of ``chunk_size``, entry times of a chunk
+    are converted to int64 arrays of minutes since epoch and added to totals
+    of each day with ``np.bincount``, so memory use does not depend on number
+    of entries.  Entries with notes ending with ``*`` are not counted.
+
+    Returns ``(days, minutes)`` arrays, where ``days`` are all days from the
+    first to the last entry (``datetime64[D]``) and ``minutes`` are work
+    minutes of each day.
+
+        >>> days, minutes = day_totals([
+        ...     {'date1': '2014-03-31 09:00', 'date2': '2014-03-31 10:30',
+        ...      'notes': '', 'breaks': 10},
+        ...     {'date1': '2014-04-01 02:00', 'date2': '2014-04-01 03:00',
+        ...      'notes': '', 'breaks': 0},
+        ...     {'date1': '2014-04-02 14:00', 'date2': '2014-04-02 15:00',
+        ...      'notes': '', 'breaks': 0},
+        ... ], chunk_size=2)
+        >>> [str(day) for day in days]
+        ['2014-03-31', '2014-04-01', '2014-04-02']
+        >>> minutes.tolist()
+        [140, 0, 60]
+
+    """
+    midnight = virtual_midnight.hour * 60 + virtual_midnight.minute
+    entries = iter(entries)
+    first = last = None
+    totals = np.zeros(0, dtype=np.int64)
+    while True:
+        chunk = list(itertools.islice(entries, chunk_size))
+        if not chunk:
+            break
+        day, minutes = _chunk_totals(chunk, midnight)
+        if not len(day):
+            continue
+
+        lo, hi = day.min(), day.max()
+        if first is None:
+            first = last = lo
+        if lo < first:
+            totals = np.concatenate([np.zeros(first - lo, np.int64), totals])
+            first = lo
+        last = max(last, hi)
+        if last - first >= len(totals):
+            # Grow geometrically, entries usually come ordered by time.
+            size = max(last - first + 1, 2 * len(totals))
+            totals = np.concatenate([
+                totals, np.zeros(size - len(totals), np.int64),
+            ])
+        totals += np.bincount(day - first, weights=minutes,
+                              minlength=len(totals)).astype(np.int64)
+
+    if first is None:
+        return np.array([], dtype='datetime64[D]'), np.array([], dtype=np.int64)
+
+    length = last - first + 1
+    days = np.arange(first, first + length).astype('datetime64[D]')
+    return days, totals[:length]
+
+
 def stats_by_day(entries, virtual_midnight=VIRTUAL_MIDNIGHT):
     """
 
@@ -48,37 +143,6 @@ def stats_by_day(entries, virtual_midnight=VIRTUAL_MIDNIGHT):
 
 
     """
-    fmt = '%Y-%m-%d %H:%M'
-    xday = last = None
-    time = datetime.timedelta()
-    for entry in entries:
-        if entry['notes'].endswith('*'): continue
-
-        date1 = datetime.datetime.strptime(entry['date1'], fmt)
-        date2 = datetime.datetime.strptime(entry['date2'], fmt)
-
-        if entry['breaks']:
-            date2 -= datetime.timedelta(minutes=entry['breaks'])
-
-        day = combine(date1, datetime.time())
-        if date1.time() <= virtual_midnight:
-            day = day - datetime.timedelta(days=1)
-
-        if last is not None and last != day:
-            while xday < last:
-                yield xday, datetime.timedelta()
-                xday += datetime.timedelta(days=1)
-            yield last, time
-            time = datetime.timedelta()
-            xday = last + datetime.timedelta(days=1)
-
-        time += date2 - date1
-        last = day
-        if xday is None:
-            xday = last + datetime.timedelta(days=1)
-
-    if last is not None:
-        while xday < last:
-            yield xday, datetime.timedelta()
-            xday += datetime.timedelta(days=1)
-        yield last, time
+    days, minutes = day_totals(entries, virtual_midnight)
+    for day, time in zip(days.astype(object), minutes.tolist()):
+        yield combine(day, datetime.time()), datetime.timedelta(minutes=time)
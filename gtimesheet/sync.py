@@ -1,18 +1,95 @@
+import json
 import codecs
+import bisect
 import datetime
 
+from .entry import Entry
 from .timelog import read_timelog
 from .timelog import timelog_to_timesheet
 from .timesheet import get_project_mapping
+from .timesheet import iter_times
+from .timesheet import times_checksum
+from .index import TimelogIndex
+from .index import virtual_day
+from .profiling import profiler
+from .metrics import metrics
 
 
-def iter_sync(ts1, ts2):
+FORMAT = '%Y-%m-%d %H:%M'
+
+# Policies for resolving overlapping Timesheet and gTimeLog entries.
+PREFER_TIMESHEET = 'timesheet'
+PREFER_TIMELOG = 'timelog'
+SPLIT = 'split'
+POLICIES = (PREFER_TIMESHEET, PREFER_TIMELOG, SPLIT)
+
+
+class Conflict(object):
+    """Overlapping Timesheet (t1) and gTimeLog (t2) entries."""
+
+    def __init__(self, t1, t2):
+        self.t1 = t1
+        self.t2 = t2
+
+    def __repr__(self):
+        return '<Conflict: %s>' % self
+
+    def __str__(self):
+        keys = ('clientName', 'projectName', 'notes')
+        notes = ': '.join(filter(None, [self.t1.get(k) for k in keys]))
+        ts = '%s -- %s: %s' % (self.t1['date1'], self.t1['date2'], notes)
+        tl = '%s -- %s: %s' % (
+            self.t2['date1'].strftime(FORMAT),
+            self.t2['date2'].strftime(FORMAT),
+            self.t2['notes'],
+        )
+        return 'Timesheet (%s) and gTimeLog (%s) entries overlap.' % (ts, tl)
+
+
+class OverlapError(Exception):
+    def __init__(self, conflict):
+        super(OverlapError, self).__init__(str(conflict))
+        self.conflict = conflict
+
+
+def _matches(t1d1, t1d2, t2d1, t2d2, breaks):
+    """Check if timesheet and timelog entries are the same entry."""
+    breaks = datetime.timedelta(minutes=breaks)
+    return (
+        (t1d1 == t2d1          and t1d2 == t2d2         ) or
+        (t1d1 == t2d1 - breaks and t1d2 == t2d2         ) or
+        (t1d1 == t2d1          and t1d2 == t2d2 + breaks)
+    )
+
+
+def _timesheet_part(t1, date1, date2, first=True):
+    part = Entry(t1, date1=date1.strftime(FORMAT),
+                 date2=date2.strftime(FORMAT))
+    if not first:
+        part.pop('id', None)
+        part['breaks'] = 0
+    if 'working' in part:
+        minutes = int((date2 - date1).total_seconds()) // 60
+        part['working'] = minutes - part['breaks']
+    return part
+
+
+def _timelog_part(t2, date1, date2):
+    return dict(t2, date1=date1, date2=date2)
+
+
+def iter_sync(ts1, ts2, policy=None):
     """Synchronize ts1 with ts2 and update both in place.
 
     :ts1: timesheet log
     :ts2: gtimelog log
+    :policy: how to resolve overlapping entries, if None, ``OverlapError`` is
+             raised, ``PREFER_TIMESHEET`` or ``PREFER_TIMELOG`` drop entry
+             from the other source and ``SPLIT`` clips entry that started
+             first, to end when the other one starts, or timelog entry, if
+             both start at the same time.
     """
-    fmt = '%Y-%m-%d %H:%M'
+    fmt = FORMAT
     ts1 = iter(ts1)
     ts2 = iter(ts2)
     t1 = next(ts1, None)
@@ -32,9 +109,6 @@ def iter_sync(ts1, ts2):
         if t2:
             t2d1 = t2['date1']
             t2d2 = t2['date2']
-            breaks = datetime.timedelta(minutes=(t1['breaks'] if t1 else 0))
-            t2d1b = t2d1 - breaks
-            t2d2b = t2d2 + breaks
 
             # Sanity checks
             assert last_t2d1 is None or last_t2d1 < t2d1
@@ -50,11 +124,7 @@ def iter_sync(ts1, ts2):
             last_t1d1 = t1d1
             t1 = next(ts1, None)
 
-        elif (
-            (t1d1 == t2d1  and t1d2 == t2d2 ) or
-            (t1d1 == t2d1b and t1d2 == t2d2 ) or
-            (t1d1 == t2d1  and t1d2 == t2d2b)
-        ):
+        elif _matches(t1d1, t1d2, t2d1, t2d2, t1['breaks']):
             yield t1, t2
             last_t1d1 = t1d1
             last_t2d1 = t2d1
@@ -69,33 +139,244 @@ def iter_sync(ts1, ts2):
             yield t1, None
             t1 = next(ts1, None)
 
+        elif policy == PREFER_TIMESHEET:
+            t2 = next(ts2, None)
+
+        elif policy == PREFER_TIMELOG:
+            t1 = next(ts1, None)
+
+        elif policy == SPLIT:
+            if t1d1 < t2d1:
+                yield _timesheet_part(t1, t1d1, t2d1), None
+                if t1d2 > t2d2:
+                    t1 = _timesheet_part(t1, t2d2, t1d2, first=False)
+                else:
+                    t1 = next(ts1, None)
+            elif t2d1 < t1d1:
+                yield None, _timelog_part(t2, t2d1, t1d1)
+                if t2d2 > t1d2:
+                    t2 = _timelog_part(t2, t1d2, t2d2)
+                else:
+                    t2 = next(ts2, None)
+            else:
+                # Timesheet entry could be a part written by an earlier run,
+                # so it is kept as is, to not split it again.
+                yield t1, None
+                if t2d2 > t1d2:
+                    t2 = _timelog_part(t2, t1d2, t2d2)
+                else:
+                    t2 = next(ts2, None)
+                t1 = next(ts1, None)
+
         else:
-            sft = lambda o: o.strftime(fmt)
-            keys = ('clientName', 'projectName', 'notes')
-            notes = ': '.join(filter(None, [t1[k] for k in keys]))
-            ts = '%s -- %s: %s' % (sft(t1d1), sft(t1d2), notes)
-            tl = '%s -- %s: %s' % (sft(t2d1), sft(t2d2), t2['notes'])
-            raise Exception(
-                'Timesheet (%s) and gTimeLog (%s) entries overlap.' % (ts, tl)
-            )
+            raise OverlapError(Conflict(t1, t2))
+
+
+class IntervalIndex(object):
+    """Index of (start, end, item) intervals for overlap queries.
+
+        >>> index = IntervalIndex([(1, 3, 'a'), (2, 8, 'b'), (5, 6, 'c')])
+        >>> index.overlapping(4, 5)
+        ['b']
+        >>> index.overlapping(3, 6)
+        ['b', 'c']
+        >>> index.overlapping(8, 9)
+        []
+
+    """
+
+    def __init__(self, intervals):
+        self.intervals = sorted(intervals, key=lambda x: (x[0], x[1]))
+        self.starts = [start for start, end, item in self.intervals]
+        self.maxends = []
+        maxend = None
+        for start, end, item in self.intervals:
+            maxend = end if maxend is None else max(maxend, end)
+            self.maxends.append(maxend)
+
+    def overlapping(self, start, end):
+        """Return items of intervals, that overlap with [start, end)."""
+        lo = bisect.bisect_right(self.maxends, start)
+        hi = bisect.bisect_left(self.starts, end, lo)
+        result = []
+        for i in range(lo, hi):
+            istart, iend, item = self.intervals[i]
+            if iend > start:
+                result.append(item)
+        return result
+
+
+def find_conflicts(ts1, ts2):
+    """Find all overlapping Timesheet and gTimeLog entries in one pass.
+
+    Returns list of ``Conflict`` objects ordered by timesheet entry start.
+    """
+    fmt = FORMAT
+    spt = lambda o: datetime.datetime.strptime(o, fmt)
+    index = IntervalIndex((t2['date1'], t2['date2'], t2) for t2 in ts2)
+    conflicts = []
+    for t1 in ts1:
+        t1d1, t1d2 = spt(t1['date1']), spt(t1['date2'])
+        for t2 in index.overlapping(t1d1, t1d2):
+            t2d1, t2d2 = t2['date1'], t2['date2']
+            if _matches(t1d1, t1d2, t2d1, t2d2, t1['breaks']):
+                continue
+            if t1d1 >= t2d2 or t2d1 >= t1d2:
+                continue
+            conflicts.append(Conflict(t1, t2))
+    return conflicts
 
 
-def sync(timesheet_db, timelog_path, midnight):
-    """Yields merged tuples of ordered timesheet and timelog files."""
+def sync(timesheet_db, timelog_path, midnight, since=None, index=None,
+         policy=None):
+    """Yields merged tuples of ordered timesheet and timelog files.
+
+    If ``since`` date is given, only entries starting from that virtual day are
+    merged, timelog file is read starting from offset found in the day index.
+    """
 
     with codecs.open(timelog_path, 'r', encoding='utf-8') as f:
-        ts1 = timesheet_db['times'].find(order_by=['date1'])
-        ts2 = read_timelog(f, midnight)
-        for timesheet, timelog in iter_sync(ts1, ts2):
+        if since is None:
+            ts1 = iter_times(timesheet_db)
+        else:
+            index = index or TimelogIndex(timelog_path, midnight).update()
+            f.seek(index.offset(since))
+            since = '%s %s' % (since.strftime('%Y-%m-%d'), midnight)
+            ts1 = iter_times(timesheet_db, since)
+        ts1 = profiler.iterate('timesheet', ts1)
+        ts2 = profiler.iterate('timelog', read_timelog(f, midnight))
+        for timesheet, timelog in iter_sync(ts1, ts2, policy):
             yield timesheet, timelog
 
 
+def sync_conflicts(timesheet_db, timelog_path, midnight):
+    """Find all overlapping entries of timesheet and timelog files."""
+    with codecs.open(timelog_path, 'r', encoding='utf-8') as f:
+        return find_conflicts(
+            profiler.iterate('timesheet', iter_times(timesheet_db)),
+            profiler.iterate('timelog', read_timelog(f, midnight)),
+        )
+
+
+class Watermark(object):
+    """Last merged virtual day, persisted between runs.
+
+    Together with the day, a checksum of all timesheet rows before that day and
+    offset of that day in timelog.txt are stored.  If any of those rows change,
+    for example were edited on the phone, or timelog.txt was rewritten, the
+    watermark is not valid anymore and full merge must be done.
+    """
+
+    def __init__(self, filename, midnight):
+        self.filename = str(filename)
+        self.midnight = midnight
+        self.day = None
+        self.checksum = None
+        self.offset = None
+        self.merged = None
+
+    def load(self):
+        try:
+            with open(self.filename) as f:
+                data = json.load(f)
+        except (IOError, ValueError):
+            return False
+        if data.get('midnight') != self.midnight:
+            return False
+        self.day = datetime.datetime.strptime(data['day'], '%Y-%m-%d').date()
+        self.checksum = data['checksum']
+        self.offset = data['offset']
+        return True
+
+    def save(self):
+        data = {
+            'day': self.day.strftime('%Y-%m-%d'),
+            'midnight': self.midnight,
+            'checksum': self.checksum,
+            'offset': self.offset,
+        }
+        with open(self.filename, 'w') as f:
+            json.dump(data, f)
+
+    def start(self, day):
+        return '%s %s' % (day.strftime('%Y-%m-%d'), self.midnight)
+
+    def since(self, db, index):
+        """Return day to continue merging from or None for full merge."""
+        if self.day is None and not self.load():
+            return None
+        if index.offset(self.day) != self.offset:
+            return None
+        if times_checksum(db, self.start(self.day)) != self.checksum:
+            return None
+        return self.day
+
+    def update(self, db, index, day):
+        self.day = day
+        self.checksum = times_checksum(db, self.start(day))
+        self.offset = index.offset(day)
+
+    def commit(self, db, index=None):
+        """Move watermark to the last merged day and save it.
+
+        Must be called after merged entries are written, since the checksum
+        covers rows written by the merge.  ``index`` is needed, if timelog.txt
+        was rewritten.
+        """
+        if self.merged is None:
+            return
+        merged_index, day = self.merged
+        self.update(db, index or merged_index, day)
+        self.save()
+        self.merged = None
+
+
+def resume_point(timesheet_db, timelog_path, midnight, watermark):
+    """Return updated timelog index and day to continue merging from.
+
+    Day is None, if full merge must be done.
+    """
+    index = TimelogIndex(timelog_path, midnight).update()
+    return index, watermark.since(timesheet_db, index)
+
+
+def incremental_sync(timesheet_db, timelog_path, midnight, watermark,
+                     save=True, policy=None, resume=None):
+    """Merge only entries starting from last merged day.
+
+    The last merged day is merged again on each run, because more entries
+    could have been added to it.  After all entries are yielded, watermark is
+    moved to the last merged day, or if ``save`` is False, only the day is
+    remembered until ``Watermark.commit`` is called.  ``resume`` is
+    ``resume_point`` result, if it was already computed.
+    """
+    if resume is None:
+        resume = resume_point(timesheet_db, timelog_path, midnight, watermark)
+    index, since = resume
+    last = None
+    for timesheet, timelog in sync(timesheet_db, timelog_path, midnight,
+                                   since, index, policy):
+        last = timesheet, timelog
+        yield timesheet, timelog
+
+    if last is not None:
+        timesheet, timelog = last
+        if timesheet:
+            date1 = datetime.datetime.strptime(timesheet['date1'],
+                                               '%Y-%m-%d %H:%M')
+        else:
+            date1 = timelog['date1']
+        watermark.merged = index, virtual_day(date1, midnight)
+        if save:
+            watermark.commit(timesheet_db)
+
+
 def sync_to_timesheet(db, entries):
     projects = get_project_mapping(db)
     for timesheet, timelog in entries:
         if timesheet and timelog:
             entry = timelog_to_timesheet(timelog, projects)
-            entry = dict(entry, **timesheet)
+            entry.update(timesheet)
             source = 'BOTH'
         elif timesheet:
             entry = timesheet
@@ -103,4 +384,5 @@ def sync_to_timesheet(db, entries):
         elif timelog:
             entry = timelog_to_timesheet(timelog, projects)
             source = 'TIMELOG'
+        metrics.inc('gtimesheet_entries_total', source=source)
         yield source, entry
@@ -0,0 +1,138 @@
+"""Summaries for a team, with a separate gtimelogrc for each user.
+
+Users are processed in parallel on a process pool, each worker runs sync,
+overtime and report scheduling for one user and returns a small summary, so
+that only summaries are sent back to the main process.  A failure of one user
+does not stop others.
+
+"""
+
+import os
+import datetime
+import collections
+
+from concurrent.futures import ProcessPoolExecutor
+
+from . import timesheet
+from .sync import sync
+from .sync import sync_to_timesheet
+from .overtime import get_overtime
+from .holidays import Holidays
+from .tracker import SentReports
+from .tracker import schedule
+from .tracker import ReportsLog
+from .utils import open_files
+from .utils import format_hours
+from .settings import Settings
+
+SOURCES = ('TIMELOG', 'TIMESHEET', 'BOTH')
+
+COLUMNS = [
+    ('user', '%-20s'),
+    ('TIMELOG', '%8s'),
+    ('TIMESHEET', '%9s'),
+    ('BOTH', '%6s'),
+    ('days', '%6s'),
+    ('work time', '%10s'),
+    ('overtime', '%9s'),
+    ('pending', '%8s'),
+]
+
+
+def find_configs(directory):
+    """Return paths of all configuration files in directory."""
+    return sorted(
+        os.path.join(directory, name)
+        for name in os.listdir(directory)
+        if not name.startswith('.') and
+        os.path.isfile(os.path.join(directory, name))
+    )
+
+
+def user_summary(config, now=None):
+    """Sync, compute overtime and schedule reports for one user."""
+    args = collections.defaultdict(lambda: None, {'--config': config})
+    cfg = Settings()
+    cfg.load(args)
+
+    midnight = cfg.virtual_midnight.strftime('%H:%M')
+    db = timesheet.connect(cfg.timesheet)
+    sources = collections.Counter()
+    entries = []
+    for source, entry in sync_to_timesheet(
+        db, sync(db, str(cfg.timelog), midnight, policy=cfg.resolve),
+    ):
+        sources[source] += 1
+        entries.append(entry)
+
+    with open_files(cfg.holidays) as files:
+        holidays = Holidays(files)
+    totaltime, worktime, overtime = get_overtime(entries, cfg.part_time,
+                                                 holidays)
+
+    # Same sent reports index and schedule as the send command uses.
+    with SentReports(cfg.sent_reports) as reports:
+        replog = ReportsLog(reports, now=now)
+        pending = sum(1 for report in schedule(entries, replog, now=now))
+
+    return {
+        'user': cfg.name or os.path.basename(config),
+        'sources': dict(sources),
+        'days': totaltime // cfg.part_time if cfg.part_time else 0,
+        'worktime': worktime,
+        'overtime': overtime,
+        'pending': pending,
+    }
+
+
+def team_summaries(configs, jobs=None):
+    """Run ``user_summary`` for all configs on a process pool.
+
+    Returns ``(config, summary, error)`` tuples in the order of configs.
+    """
+    results = []
+    with ProcessPoolExecutor(jobs) as executor:
+        futures = [(config, executor.submit(user_summary, config))
+                   for config in configs]
+        for config, future in futures:
+            try:
+                results.append((config, future.result(), None))
+            except Exception as e:
+                results.append((config, None, e))
+    return results
+
+
+def format_row(values):
+    return ' '.join(fmt % value for (name, fmt), value in zip(COLUMNS, values))
+
+
+def print_team(results):
+    """Print aggregated table of team summaries, returns number of failures."""
+    print(format_row([name for name, fmt in COLUMNS]))
+    total = collections.Counter()
+    worktime = overtime = datetime.timedelta()
+    failed = 0
+    for config, summary, error in results:
+        if error is not None:
+            failed += 1
+            print('%-20s FAILED: %s: %s' % (
+                os.path.basename(config), type(error).__name__, error,
+            ))
+            continue
+        sources = summary['sources']
+        total.update(sources)
+        total.update(days=summary['days'], pending=summary['pending'])
+        worktime += summary['worktime']
+        overtime += summary['overtime']
+        print(format_row(
+            [summary['user'][:20]] +
+            [sources.get(source, 0) for source in SOURCES] +
+            [summary['days'], format_hours(summary['worktime']),
+             format_hours(summary['overtime']), summary['pending']]
+        ))
+    print(format_row(
+        ['total'] + [total[source] for source in SOURCES] +
+        [total['days'], format_hours(worktime), format_hours(overtime),
+         total['pending']]
+    ))
+    return failed
@@ -1,11 +1,150 @@
 import os
+import mmap
 import datetime
 
-from contextlib import contextmanager
-from tempfile import NamedTemporaryFile
+from .entry import Entry
+from .utils import atomic_write
+from .metrics import metrics
 
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M'
 
-def read_timelog(f, midnight):
+# Length of the fixed ``YYYY-MM-DD HH:MM: `` prefix of each timelog line.
+PREFIX_LENGTH = 18
+
+
+def parse_line(line):
+    """Split a stripped timelog.txt line into timestamp and note.
+
+    gtimelog always writes ``YYYY-MM-DD HH:MM: `` in front of each note, so
+    the timestamp is read by slicing fixed positions instead of going through
+    ``strptime``.  Lines that do not follow this layout are parsed the slow
+    way.
+
+    >>> parse_line('2014-03-24 18:14: project: t1')
+    (datetime.datetime(2014, 3, 24, 18, 14), 'project: t1')
+
+    >>> parse_line('2014-3-4 8:14: project: t1')
+    (datetime.datetime(2014, 3, 4, 8, 14), 'project: t1')
+
+    """
+    if line[16:18] == ': ':
+        try:
+            return datetime.datetime(
+                int(line[0:4]), int(line[5:7]), int(line[8:10]),
+                int(line[11:13]), int(line[14:16]),
+            ), line[PREFIX_LENGTH:]
+        except ValueError:
+            pass
+    time, note = line.split(': ', 1)
+    return datetime.datetime.strptime(time, TIMESTAMP_FORMAT), note
+
+
+def _range_keys(midnight, since, until):
+    hour, minute = map(int, midnight.split(':'))
+    midnight = datetime.time(hour, minute)
+    keys = []
+    for date in (since, until):
+        if date is not None:
+            date = datetime.datetime.combine(date, midnight)
+            date = date.strftime(TIMESTAMP_FORMAT)
+        keys.append(date)
+    return keys
+
+
+def _bisect_timelog(mm, key, lo=0):
+    """Find offset of first line, which timestamp is not less than key.
+
+    Timelog lines are sorted and start with fixed width timestamps, so plain
+    bytes comparison of line prefixes is enough.
+    """
+    size = len(mm)
+    hi = size
+    while lo < hi:
+        mid = (lo + hi) // 2
+        start = mm.rfind(b'\n', lo, mid) + 1 or lo
+
+        # Skip blank lines.
+        line = end = start
+        while line < size:
+            end = mm.find(b'\n', line)
+            end = size if end == -1 else end + 1
+            if mm[line:end].strip():
+                break
+            line = end
+
+        if line < size and mm[line:line + len(key)] < key:
+            lo = end
+        else:
+            hi = start
+    return lo
+
+
+def _mmap_range(f, since, until):
+    try:
+        fileno = f.fileno()
+    except (AttributeError, IOError, ValueError):
+        return None
+    if os.fstat(fileno).st_size == 0:
+        return []
+    mm = mmap.mmap(fileno, 0, access=mmap.ACCESS_READ)
+    try:
+        start = 0 if since is None else _bisect_timelog(mm, since)
+        end = len(mm) if until is None else _bisect_timelog(mm, until, start)
+        return mm[start:end].decode('utf-8').splitlines()
+    finally:
+        mm.close()
+
+
+def _filter_range(f, since, until):
+    for line in f:
+        time = line.strip()[:16]
+        if not time:
+            continue
+        elif until is not None and time >= until:
+            break
+        elif since is None or time >= since:
+            yield line
+
+
+def timelog_range(f, midnight, since=None, until=None):
+    r"""Return timelog lines of days from since (inclusive) to until.
+
+    ``since`` and ``until`` are virtual days.  If ``f`` is a real file, it is
+    memory mapped and range boundaries are found using binary search, so only
+    lines in the range are read.  Other file like objects are scanned.
+
+    >>> from io import StringIO
+    >>> f = StringIO('''
+    ... 2014-03-24 18:14: project: t1
+    ... 2014-03-25 05:14: project: t1
+    ... 2014-03-25 18:14: project: t2
+    ... 2014-03-26 18:14: project: t3
+    ... ''')
+    >>> list(timelog_range(f, '06:00', datetime.date(2014, 3, 25),
+    ...                    datetime.date(2014, 3, 26)))
+    ['2014-03-25 18:14: project: t2\n']
+
+    """
+    since, until = _range_keys(midnight, since, until)
+    lines = _mmap_range(f, since.encode('ascii') if since else None,
+                        until.encode('ascii') if until else None)
+    if lines is None:
+        lines = _filter_range(f, since, until)
+    return lines
+
+
+def _count_lines(f):
+    parsed = 0
+    try:
+        for line in f:
+            if line.strip():
+                parsed += 1
+            yield line
+    finally:
+        metrics.inc('gtimesheet_timelog_lines_total', parsed)
+
+
+def read_timelog(f, midnight='06:00', since=None, until=None):
     r"""
 
     >>> from pprint import pprint as pp
@@ -131,7 +270,23 @@ def read_timelog(f, midnight):
     2014-04-01 15:41:00 -- 2014-04-01 16:04:00: tea **
     2014-04-01 16:04:00 -- 2014-04-01 18:00:00: p2: t5
 
+    Only read days from ``since`` up to, but not including, ``until``:
+
+    >>> f.seek(0)
+    0
+    >>> print_timelog(read_timelog(f, since=datetime.date(2014, 3, 25),
+    ...                            until=datetime.date(2014, 4, 1)))
+    2014-03-25 09:40:00 -- 2014-03-25 09:40:00: start
+    2014-03-31 15:48:00 -- 2014-03-31 17:10:00: p2: t1
+    2014-03-31 17:10:00 -- 2014-03-31 17:38:00: p2: t2
+    2014-03-31 17:38:00 -- 2014-03-31 18:51:00: p2: t3
+
     """
+    if since is not None or until is not None:
+        f = timelog_range(f, midnight, since, until)
+    if metrics.enabled:
+        f = _count_lines(f)
+
     last = None
     nextday = None
     hour, minute = map(int, midnight.split(':'))
@@ -143,8 +298,7 @@ def read_timelog(f, midnight):
         line = line.strip()
         if line == '': continue
 
-        time, note = line.split(': ', 1)
-        time = datetime.datetime.strptime(time, '%Y-%m-%d %H:%M')
+        time, note = parse_line(line)
 
         if nextday is None or time >= nextday:
             if last is not None and entries == 0:
@@ -223,11 +377,11 @@ def timelog_to_timesheet(timelog, projects):
     :timelog: item returned by ``read_timelog``
 
     >>> from pprint import pprint as pp
-    >>> pp(timelog_to_timesheet({
+    >>> pp(dict(timelog_to_timesheet({
     ...     'date1': datetime.datetime(2014, 3, 31, 15, 48),
     ...     'date2': datetime.datetime(2014, 3, 31, 17, 10),
     ...     'notes': 'project: t2',
-    ... }, {'my project': 'project', 'project': 1}))
+    ... }, {'my project': 'project', 'project': 1})))
     {'amount': 0.0,
      'amountperhour': 0.0,
      'breaks': 0,
@@ -248,7 +402,7 @@ def timelog_to_timesheet(timelog, projects):
     notes = list(map(str.strip, timelog['notes'].split(':', 2)))
     client, project, notes = ['']*(3-len(notes)) + notes
     project, project_id = resolvekw(project, projects, default=0)
-    return {
+    return Entry({
         'clientName': client,
         'projectName': project,
         'project': '%d' % project_id,
@@ -262,10 +416,10 @@ def timelog_to_timesheet(timelog, projects):
         'notes': notes,
         'methodid': 0,
         'status': 0,
-    }
+    })
 
 
-def timesheets_to_timelog(timesheets, midnight):
+def timesheets_to_timelog(timesheets, midnight='06:00'):
     """Convert list of timesheet records to timelog.txt format.
 
     This function yields timelog line one be one.
@@ -414,11 +568,115 @@ def timesheets_to_timelog(timesheets, midnight):
         last = ts['date2']
 
 
-@contextmanager
-def timelog_file(entries, midnight):
-    f = NamedTemporaryFile(delete=False)
-    for line in timesheets_to_timelog(entries, midnight):
-        f.write(line.encode('utf-8') + b'\n')
-    f.close()
-    yield f.name
-    os.unlink(f.name)
+def timelog_items(timesheets, midnight='06:00'):
+    """Convert timesheet records to gTimeLog time log items.
+
+    Yields ``(time, entry)`` tuples, the same way as gTimeLog reads them from
+    timelog.txt, without writing and reading back a temporary file.
+
+    >>> from pprint import pprint as pp
+    >>> pp(list(timelog_items([
+    ...     {'breaks': 0,
+    ...      'date1': '2014-03-31 15:48',
+    ...      'date2': '2014-03-31 17:10',
+    ...      'notes': 't2',
+    ...      'projectName': 'project'},
+    ... ])))
+    [(datetime.datetime(2014, 3, 31, 15, 48), 'start'),
+     (datetime.datetime(2014, 3, 31, 17, 10), 'project: t2')]
+
+    """
+    for line in timesheets_to_timelog(timesheets, midnight):
+        if line:
+            yield parse_line(line)
+
+
+class TimelogChanged(Exception):
+    """timelog.txt was changed by someone else, while it was updated."""
+
+
+def _signature(filename):
+    try:
+        stat = os.stat(filename)
+    except OSError:
+        return None
+    return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+
+def update_timelog(filename, lines, start=0):
+    """Write timelog lines to timelog.txt, changing as little as possible.
+
+    Lines are compared with the file on disk.  If only new lines were added at
+    the end, they are appended, otherwise file is rewritten starting from the
+    first different line, using temporary file, which atomically replaces
+    timelog.txt.
+
+    If ``start`` byte offset is given, lines are compared with the file
+    starting from that offset, and the content before it is kept as is.
+
+    Lines are usually generated from timelog.txt itself, so if gTimeLog
+    writes to it before they are written out, ``TimelogChanged`` is raised
+    and the file is left as gTimeLog wrote it.
+
+    Returns ``(status, count)``, where status is one of ``'unchanged'``,
+    ``'append'`` or ``'rewrite'`` and count is number of written lines.
+    """
+    filename = str(filename)
+    signature = _signature(filename)
+    lines = iter(lines)
+    status = 'append'
+    offset = start
+    missing_newline = False
+    rest = []
+
+    if os.path.exists(filename):
+        with open(filename, 'rb') as f:
+            f.seek(start)
+            for old in f:
+                new = next(lines, None)
+                if new is None:
+                    status = 'rewrite'
+                    break
+                new = new.encode('utf-8') + b'\n'
+                if old == new:
+                    offset += len(old)
+                elif old + b'\n' == new:
+                    # Last line of the file has no trailing new line.
+                    offset += len(old)
+                    missing_newline = True
+                else:
+                    status = 'rewrite'
+                    rest.append(new)
+                    break
+
+    # Lines are generated while reading timelog.txt, so all of them must be
+    # read before the file is changed.
+    rest.extend(line.encode('utf-8') + b'\n' for line in lines)
+
+    if status == 'append':
+        if not rest:
+            return 'unchanged', 0
+        if _signature(filename) != signature:
+            raise TimelogChanged(filename)
+        with open(filename, 'ab') as f:
+            if missing_newline:
+                f.write(b'\n')
+            f.writelines(rest)
+            f.flush()
+            os.fsync(f.fileno())
+
+    else:
+        with atomic_write(filename, 'wb', prefix='.timelog-') as tmp:
+            with open(filename, 'rb') as f:
+                size = offset
+                while size > 0:
+                    chunk = f.read(min(size, 1024 * 1024))
+                    if not chunk:
+                        break
+                    tmp.write(chunk)
+                    size -= len(chunk)
+            tmp.writelines(rest)
+            if _signature(filename) != signature:
+                raise TimelogChanged(filename)
+
+    return status, len(rest)
@@ -1,5 +1,166 @@
+"""Access to Timesheet Android app SQLite database.
+
+Database is mostly only read, so by default it is opened in read-only mode,
+and if there are no pending write-ahead log changes, in immutable mode, which
+skips all locking.
+
+"""
+
+import os
+import sqlite3
+import hashlib
+
+from urllib.parse import quote
+
+from .entry import Entry
+
+SELECT_TIMES = 'SELECT * FROM times ORDER BY date1'
+SELECT_TIMES_SINCE = 'SELECT * FROM times WHERE date1 >= ? ORDER BY date1'
+SELECT_TIMES_BEFORE = 'SELECT * FROM times WHERE date1 < ? ORDER BY date1, id'
+SELECT_PROJECTS = 'SELECT DISTINCT projectName, project FROM times'
+
+# Bound parameters per statement, SQLite default limit is 999.
+MAX_VARIABLES = 500
+
+
+# Columns of times table, as created by Timesheet app.
+COLUMNS = [
+    ('clientName', 'TEXT'),
+    ('projectName', 'TEXT'),
+    ('project', 'TEXT'),
+    ('amountperhour', 'REAL'),
+    ('date1', 'TEXT'),
+    ('date2', 'TEXT'),
+    ('working', 'INTEGER'),
+    ('breaks', 'INTEGER'),
+    ('overtime', 'INTEGER'),
+    ('amount', 'REAL'),
+    ('notes', 'TEXT'),
+    ('methodid', 'INTEGER'),
+    ('status', 'INTEGER'),
+]
+
+
+def connect(path, readonly=True):
+    """Open Timesheet database, by default read-only.
+
+    If database file does not exist, empty in-memory database is returned for
+    reading.
+    """
+    path = str(path)
+    if not readonly:
+        return sqlite3.connect(path)
+    if not os.path.exists(path):
+        return sqlite3.connect(':memory:')
+    uri = 'file:%s?mode=ro' % quote(os.path.abspath(path))
+    if not os.path.exists(path + '-wal'):
+        uri += '&immutable=1'
+    return sqlite3.connect(uri, uri=True)
+
+
+def has_times(db):
+    cursor = db.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'times'"
+    )
+    return cursor.fetchone() is not None
+
+
+def iter_rows(cursor, factory=dict):
+    """Stream cursor rows as dicts, or as given dict like type."""
+    names = [column[0] for column in cursor.description]
+    for row in cursor:
+        yield factory(zip(names, row))
+
+
+def iter_times(db, since=None):
+    """Iterate over times table rows ordered by start time.
+
+    :since: if given, only rows with ``date1 >= since`` are returned.
+    """
+    if not has_times(db):
+        return iter([])
+    if since is None:
+        cursor = db.execute(SELECT_TIMES)
+    else:
+        cursor = db.execute(SELECT_TIMES_SINCE, (since,))
+    return iter_rows(cursor, Entry)
+
+
 def get_project_mapping(db):
     mapping = {}
-    for row in db['times'].distinct('projectName', 'project'):
-        mapping[row['projectName']] = int(row['project'])
+    if not has_times(db):
+        return mapping
+    for name, project in db.execute(SELECT_PROJECTS):
+        mapping[name] = int(project)
     return mapping
+
+
+def times_checksum(db, until):
+    """Checksum of all times table rows, that start before given time."""
+    checksum = hashlib.sha1()
+    if has_times(db):
+        for row in db.execute(SELECT_TIMES_BEFORE, (until,)):
+            checksum.update(repr(row).encode('utf-8'))
+    return checksum.hexdigest()
+
+
+def create_times(db):
+    db.execute('CREATE TABLE IF NOT EXISTS times (id INTEGER PRIMARY KEY, %s)' %
+               ', '.join('%s %s' % column for column in COLUMNS))
+
+
+def get_columns(db):
+    return [row[1] for row in db.execute('PRAGMA table_info(times)')]
+
+
+def write_times(db, entries):
+    """Write merged entries back to times table in a single transaction.
+
+    Entries are ``(source, entry)`` tuples returned by ``sync_to_timesheet``.
+    Entries carrying Timesheet ``id`` are updated by that id, but only if any
+    of their values differ from the row, since split parts of Timesheet
+    entries can have their times shifted.  Entries without ``id``, that is
+    ``TIMELOG`` entries and parts split off a Timesheet entry, are inserted as
+    new rows.
+
+    Returns number of inserted and updated rows.
+    """
+    inserts = {}
+    candidates = []
+    for source, entry in entries:
+        if entry.get('id') is not None:
+            candidates.append(entry)
+        else:
+            inserts.setdefault(frozenset(entry), []).append(entry)
+
+    with db:
+        create_times(db)
+        columns = [name for name in get_columns(db) if name != 'id']
+        # Timelog entries have only the columns known to Timesheet app, others
+        # are left to their defaults, while split parts have all of them.
+        for keys, group in inserts.items():
+            names = [name for name in columns if name in keys]
+            db.executemany('INSERT INTO times (%s) VALUES (%s)' % (
+                ', '.join(names), ', '.join('?' for name in names),
+            ), [tuple(entry[name] for name in names) for entry in group])
+
+        rows = {}
+        ids = [entry['id'] for entry in candidates]
+        for i in range(0, len(ids), MAX_VARIABLES):
+            chunk = ids[i:i + MAX_VARIABLES]
+            cursor = db.execute('SELECT * FROM times WHERE id IN (%s)' % (
+                ', '.join('?' for id in chunk),
+            ), chunk)
+            rows.update((row['id'], row) for row in iter_rows(cursor))
+        updates = [
+            tuple(entry.get(name) for name in columns) + (entry['id'],)
+            for entry in candidates
+            if entry['id'] in rows and any(
+                entry.get(name) != rows[entry['id']].get(name)
+                for name in columns
+            )
+        ]
+        db.executemany('UPDATE times SET %s WHERE id = ?' % (
+            ', '.join('%s = ?' % name for name in columns),
+        ), updates)
+    return sum(map(len, inserts.values())), len(updates)
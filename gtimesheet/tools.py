@@ -2,19 +2,30 @@
 
 Usage:
   gtimesheet [--config=<filename>] [--dry-run] [--timesheet=<filename>]
-             [--timelog=<filename>]
-  gtimesheet send [--config=<filename>] [--dry-run] [--fake]
+             [--timelog=<filename>] [--update]
+             [--resolve=<policy>]
+  gtimesheet send [--config=<filename>] [--dry-run] [--fake] [--batch]
              [--sent-reports=<filename>] [--timesheet=<filename>]
              [--timelog=<filename>] [--email=<email>] [--name=<name>]
-             [--from-email=<email>]
+             [--from-email=<email>] [--resolve=<policy>]
   gtimesheet stats [--config=<filename>] [--timesheet=<filename>]
-             [--timelog=<filename>]
+             [--timelog=<filename>] [--resolve=<policy>]
   gtimesheet overtime [--config=<filename>] [--holidays=<filename>...]
              [--work-hours=<hrs-per-day>] [--timesheet=<filename>]
-             [--timelog=<filename>]
+             [--timelog=<filename>] [--resolve=<policy>]
   gtimesheet overtime-graph [--config=<filename>] [--holidays=<filename>...]
              [--work-hours=<hrs-per-day>] [--timesheet=<filename>]
+             [--timelog=<filename>] [--resolve=<policy>]
+  gtimesheet conflicts [--config=<filename>] [--timesheet=<filename>]
              [--timelog=<filename>]
+  gtimesheet sync [--config=<filename>] [--write [--incremental]]
+             [--timesheet=<filename>] [--timelog=<filename>]
+             [--resolve=<policy>]
+  gtimesheet watch [--config=<filename>] [--write] [--interval=<seconds>]
+             [--timesheet=<filename>] [--timelog=<filename>]
+             [--resolve=<policy>]
+  gtimesheet compact [--config=<filename>] [--sent-reports=<filename>]
+  gtimesheet team [--jobs=<n>] <directory>
   gtimesheet (-h | --help)
   gtimesheet --version
 
@@ -25,6 +36,20 @@ Options:
                 Configuration file. [default: ~/.gtimelog/gtimelogrc]
   --dry-run     Just show what will be done without doing anything.
   --fake        Fill sent reports state file, without sending any report.
+  --batch       Send all pending reports without asking, over one SMTP
+                session.  Transient failures are retried.
+  --write       Write merged entries back to Timesheet database.
+  --incremental
+                Merge and write only entries since the last merged day.
+                Other entries were written by previous runs.
+  --update      Write merged entries to timelog.txt instead of printing
+                them.  New lines are appended, if the rest of the file did
+                not change.
+  --resolve=<policy>
+                How to resolve overlapping Timesheet and gTimeLog entries:
+                timesheet - keep Timesheet entry, timelog - keep gTimeLog
+                entry, split - cut entry that started first.  By default
+                overlapping entries are reported as an error.
   --holidays=<filename...>
                 Configuration files for holidays. You can use this parameter
                 more than once to include more holiday files.
@@ -36,95 +61,226 @@ Options:
                 gTimeLog timelog.txt file.
   --work-hours=<hrs-per-day>
                 Hours per day with given total hours per day, example: 3.5/7
+  --interval=<seconds>
+                How often watched files are checked for changes, when
+                inotify is not available, 2 seconds by default.
+  --jobs=<n>    Number of worker processes, by default number of CPUs.
+  --profile     Can be given to any command.  Print wall-clock and CPU time
+                and number of items of each stage to stderr.  Use
+                --profile=<filename> to also write cProfile stats of the whole
+                run to given file.
 
 """
 
+import sys
+import time
 import datetime
-import dataset
 
 from docopt import docopt
 from gtimesheet import __version__
 from datetime import timedelta
-from contextlib import contextmanager
 
+from . import timesheet
 from .sync import sync
+from .sync import incremental_sync
+from .sync import Watermark
+from .sync import sync_conflicts
 from .sync import sync_to_timesheet
 from .timelog import timesheets_to_timelog
-from .timelog import timelog_file
-from .mailer import send_reports
-from .stats import stats_by_day
-from .overtime import get_overtime
-from .overtime import overtime_graph
+from .timelog import update_timelog
 from .holidays import Holidays
 from .utils import format_timedelta
 from .utils import format_hours
 from .utils import open_files
-from .tracker import get_sent_reports
-from .tracker import ReportsLog
 from .settings import Settings
+from .profiling import profiler
+from .metrics import metrics
 
 
-@contextmanager
-def _replog(cfg):
-    if not cfg.dry_run and cfg.sent_reports:
-        with cfg.sent_reports.open('a') as f:
-            yield f
-    else:
-        yield None
+def pop_profile(argv):
+    """Remove ``--profile[=<filename>]`` option from command line arguments.
+
+        >>> pop_profile(['send', '--profile=send.prof', '--batch'])
+        (['send', '--batch'], 'send.prof')
+        >>> pop_profile(['--profile'])
+        ([], '')
+        >>> pop_profile(['stats'])
+        (['stats'], None)
+
+    """
+    profile = None
+    rest = []
+    for arg in argv:
+        if arg == '--profile':
+            profile = ''
+        elif arg.startswith('--profile='):
+            profile = arg[len('--profile='):]
+        else:
+            rest.append(arg)
+    return rest, profile
 
 
 def gtimesheet():
-    args = docopt(__doc__, version=__version__)
-    cfg = Settings()
-    cfg.load(args)
+    argv, profile = pop_profile(sys.argv[1:])
+    if profile is None:
+        return run(argv)
+
+    profiler.enable()
+    if profile:
+        import cProfile
+        cprofile = cProfile.Profile()
+        cprofile.enable()
+    try:
+        return run(argv)
+    finally:
+        if profile:
+            cprofile.disable()
+            cprofile.dump_stats(profile)
+        profiler.report()
+
+
+def run(argv):
+    started = time.perf_counter()
+    args = docopt(__doc__, argv=argv, version=__version__)
 
-    db = dataset.connect('sqlite:///%s' % cfg.timesheet)
+    if args['team']:
+        from .team import find_configs
+        from .team import team_summaries
+        from .team import print_team
+
+        jobs = int(args['--jobs']) if args['--jobs'] else None
+        configs = find_configs(args['<directory>'])
+        if print_team(team_summaries(configs, jobs)):
+            return 1
+        return
+
+    with profiler.stage('config'):
+        cfg = Settings()
+        cfg.load(args)
+
+    if not cfg.metrics_file:
+        return execute(args, cfg)
+
+    metrics.enable()
+    if not profiler.enabled:
+        profiler.enable()
+    exit_code = 1
+    try:
+        exit_code = execute(args, cfg) or 0
+        return exit_code
+    finally:
+        metrics.collect_stages(profiler)
+        metrics.set('gtimesheet_run_seconds', time.perf_counter() - started)
+        metrics.set('gtimesheet_run_exit_code', exit_code)
+        metrics.set('gtimesheet_run_timestamp_seconds', time.time())
+        metrics.write(cfg.metrics_file)
+
+
+def execute(args, cfg):
+    with profiler.stage('connect'):
+        db = timesheet.connect(cfg.timesheet, readonly=not cfg.write)
 
     midnight = '%02d:%02d' % (
         cfg.virtual_midnight.hour,
         cfg.virtual_midnight.minute,
     )
 
-    entries = sync(db, str(cfg.timelog), midnight)
-    entries = sync_to_timesheet(db, entries)
+    # Printed output must be complete, so only writes can skip merged days.
+    watermark = None
+    if cfg.incremental and cfg.write:
+        # Watermark is saved after entries are written.
+        watermark = Watermark(cfg.sync_state, midnight)
+        entries = incremental_sync(db, str(cfg.timelog), midnight, watermark,
+                                   save=False, policy=cfg.resolve)
+    else:
+        entries = sync(db, str(cfg.timelog), midnight, policy=cfg.resolve)
+    entries = profiler.iterate('merge', entries)
+    entries = profiler.iterate('convert', sync_to_timesheet(db, entries))
+
+    if args['watch']:
+        from .watch import watch
+
+        try:
+            watch(cfg, midnight)
+        except KeyboardInterrupt:
+            pass
+
+    elif args['compact']:
+        from .tracker import SentReports
+
+        with SentReports(cfg.sent_reports) as reports:
+            before, after = reports.compact()
+        print('Compacted %s from %d to %d lines.' % (
+            cfg.sent_reports, before, after,
+        ))
+
+    elif args['conflicts']:
+        conflicts = sync_conflicts(db, str(cfg.timelog), midnight)
+        for conflict in conflicts:
+            print(conflict)
+        if conflicts:
+            return 1
+
+    elif args['sync']:
+        entries = list(entries)
+        if cfg.write:
+            inserted, updated = timesheet.write_times(db, entries)
+            if watermark is not None:
+                watermark.commit(db)
+            print('Inserted %d and updated %d Timesheet entries.' % (
+                inserted, updated,
+            ))
+        else:
+            for source, entry in entries:
+                if source in ('TIMELOG', 'BOTH'):
+                    print('%9s: %s -- %s: %s' % (
+                        source, entry['date1'], entry['date2'], entry['notes'],
+                    ))
+
+    elif args['send']:
+        from .mailer import send_reports
+        from .tracker import SentReports
+        from .tracker import ReportsLog
 
-    if args['send']:
         entries = [entry for source, entry in entries]
-        reports = get_sent_reports(cfg.sent_reports)
-        with timelog_file(entries, midnight) as filename, _replog(cfg) as log:
+        with SentReports(cfg.sent_reports) as reports:
+            log = None if cfg.dry_run else reports
             replog = ReportsLog(reports, log)
             dontsend = cfg.fake or cfg.dry_run
-            send_reports(cfg, filename, entries, replog, dontsend)
+            failed = send_reports(cfg, entries, replog, dontsend, cfg.batch)
+        if failed:
+            return 1
 
     elif args['stats']:
+        from .overtime import overtime_by_day
+
         with open_files(cfg.holidays) as files:
             holidays = Holidays(files)
         entries = (entry for source, entry in entries)
-        overtime = datetime.timedelta()
-        perday = cfg.part_time
-        for date, time in stats_by_day(entries):
-            if holidays.is_holiday(date):
-                holiday = '(holiday)'
-                overtime += time
-            else:
-                holiday = ''
-                if time > perday:
-                    overtime += time - perday
-                else:
-                    overtime -= perday - time
-
+        with profiler.stage('stats'):
+            days, minutes, holiday, overtime = overtime_by_day(
+                entries, cfg.part_time, holidays)
+        for date, time, is_holiday, seconds in zip(
+            days.astype(object), minutes.tolist(), holiday, overtime.tolist(),
+        ):
             print('%s: %8s [%8s] %s' % (
-                date.strftime('%Y-%m-%d'), str(time), format_hours(overtime),
-                holiday
+                date.strftime('%Y-%m-%d'), str(timedelta(minutes=time)),
+                format_hours(timedelta(seconds=seconds)),
+                '(holiday)' if is_holiday else '',
             ))
 
     elif args['overtime']:
+        from .overtime import overtime_by_day
+        from .overtime import overtime_summary
+
         with open_files(cfg.holidays) as files:
             holidays = Holidays(files)
         h_total = cfg.hours
         h_perday = cfg.part_time
-        entries = [entry for source, entry in entries]
-        totaltime, worktime, overtime = get_overtime(entries, h_perday, holidays)
+        entries = (entry for source, entry in entries)
+        with profiler.stage('stats'):
+            series = overtime_by_day(entries, h_perday, holidays)
+        totaltime, worktime, overtime = overtime_summary(h_perday, *series)
         print()
         print('Work time:     %8s' % format_hours(worktime))
         print('Total time:    %8s' % format_hours(totaltime))
@@ -137,12 +293,19 @@ def gtimesheet():
         print('  %s' % format_timedelta(overtime, h_perday))
 
     elif args['overtime-graph']:
+        from .overtime import overtime_by_day
+        from .overtime import print_overtime
+        from .overtime import plot_overtime
+
         with open_files(cfg.holidays) as files:
             holidays = Holidays(files)
-        h_total = cfg.hours
         h_perday = cfg.part_time
-        entries = [entry for source, entry in entries]
-        overtime_graph(entries, h_perday, holidays)
+        entries = (entry for source, entry in entries)
+        with profiler.stage('stats'):
+            days, minutes, holiday, overtime = overtime_by_day(
+                entries, h_perday, holidays)
+        print_overtime(h_perday, days, minutes, holiday, overtime)
+        plot_overtime(days, overtime)
 
     elif cfg.dry_run:
         spt = lambda o: datetime.datetime.strptime(o, '%Y-%m-%d %H:%M')
@@ -156,5 +319,14 @@ def gtimesheet():
 
     else:
         entries = (entry for source, entry in entries)
-        for line in timesheets_to_timelog(entries, midnight=midnight):
-            print(line)
+        lines = timesheets_to_timelog(entries, midnight=midnight)
+        lines = profiler.iterate('format', lines)
+        if cfg.update:
+            status, count = update_timelog(cfg.timelog, lines)
+            if status == 'append':
+                print('Appended %d lines to %s.' % (count, cfg.timelog))
+            elif status == 'rewrite':
+                print('Rewrote last %d lines of %s.' % (count, cfg.timelog))
+        else:
+            for line in lines:
+                print(line)
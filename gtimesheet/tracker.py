@@ -1,9 +1,13 @@
-import arrow
+import os
+import sqlite3
 import datetime
 
 from pathlib import Path
 
 from .constants import VIRTUAL_MIDNIGHT
+from .utils import atomic_write
+
+INDEX_SUFFIX = '.db'
 
 
 def schedule(entries, replog=None, virtual_midnight=VIRTUAL_MIDNIGHT,
@@ -94,45 +98,86 @@ def schedule(entries, replog=None, virtual_midnight=VIRTUAL_MIDNIGHT,
     """
     now = now or datetime.datetime.now()
     replog = replog or ReportsLog(now=now)
-    now = arrow.get(now).floor('day').naive
-    now_week = '%d/%02d' % tuple(now.isocalendar()[:2])
-    now_month = now.strftime('%Y-%m')
+    calendar = ReportCalendar()
+    now_day = now.strftime('%Y-%m-%d')
+    now_week, now_month = calendar[now_day]
     last_month = last_week = None
 
-    can_yield = lambda last, current, now: (
+    can_yield = lambda report, last, current, now: (
         last is not None and last != current and
-        last not in replog and now > last
+        (report, last) not in replog and now > last
     )
 
-    for entry in entries:
-        day = arrow.get(entry['date1'], 'YYYY-MM-DD HH:mm')
-
-        if day.naive.time() > virtual_midnight:
-            day = day.floor('day').naive
-        else:
-            day = day.floor('day').shift(days=-1).naive
+    for day in virtual_days(entries, virtual_midnight):
+        week, month = calendar[day]
 
-        week = '%d/%02d' % tuple(day.isocalendar()[:2])
-        if can_yield(last_week, week, now_week):
+        if can_yield('weekly', last_week, week, now_week):
             yield replog.add('weekly', last_week)
         last_week = week
 
-        month = day.strftime('%Y-%m')
-        if can_yield(last_month, month, now_month):
+        if can_yield('monthly', last_month, month, now_month):
             yield replog.add('monthly', last_month)
         last_month = month
 
-        f_day = day.strftime('%Y-%m-%d')
-        if f_day not in replog and now > day:
-            yield replog.add('daily', f_day)
+        if ('daily', day) not in replog and now_day > day:
+            yield replog.add('daily', day)
 
-    if can_yield(last_week, None, now_week):
+    if can_yield('weekly', last_week, None, now_week):
         yield replog.add('weekly', last_week)
 
-    if can_yield(last_month, None, now_month):
+    if can_yield('monthly', last_month, None, now_month):
         yield replog.add('monthly', last_month)
 
 
+def virtual_days(entries, virtual_midnight=VIRTUAL_MIDNIGHT):
+    """Collapse entries to consecutive distinct virtual days.
+
+        >>> entries = [
+        ...     {'date1': '2014-03-30 15:48'},
+        ...     {'date1': '2014-03-30 17:00'},
+        ...     {'date1': '2014-03-31 06:00'},
+        ...     {'date1': '2014-03-31 06:01'},
+        ... ]
+        >>> list(virtual_days(entries))
+        ['2014-03-30', '2014-03-31']
+
+    """
+    midnight = virtual_midnight.strftime('%H:%M')
+    previous = {}
+    last = None
+    for entry in entries:
+        date1 = entry['date1']
+        day = date1[:10]
+        if date1[11:16] <= midnight:
+            if day not in previous:
+                date = datetime.datetime.strptime(day, '%Y-%m-%d').date()
+                previous[day] = (date - datetime.timedelta(days=1)).isoformat()
+            day = previous[day]
+        if day != last:
+            yield day
+            last = day
+
+
+class ReportCalendar(dict):
+    """Weekly and monthly report keys of days, computed once for each day.
+
+        >>> calendar = ReportCalendar()
+        >>> calendar['2016-01-01']
+        ('2015/53', '2016-01')
+
+    """
+
+    def __missing__(self, day):
+        date = datetime.date(int(day[:4]), int(day[5:7]), int(day[8:10]))
+        keys = self[day] = ('%d/%02d' % date.isocalendar()[:2], day[:7])
+        return keys
+
+
+def parse_sent_report(line):
+    created, report, date = line.strip().split(',')[:3]
+    return report, date, created
+
+
 def read_sent_reports(f):
     """Read sent reports log file and retur set of sent reports.
 
@@ -142,15 +187,15 @@ def read_sent_reports(f):
         ... ''')
 
         >>> read_sent_reports(sentreports)
-        set(['2014-05'])
+        {('monthly', '2014-05')}
 
     """
     reports = set()
     for line in f:
         line = line.strip()
         if line:
-            created, report, date = line.strip().split(',')[:3]
-            reports.add(date)
+            report, date, created = parse_sent_report(line)
+            reports.add((report, date))
     return reports
 
 
@@ -163,18 +208,133 @@ def get_sent_reports(filename):
         return set()
 
 
+class SentReports(object):
+    """Sent reports log, indexed by ``(report, period)`` in SQLite database.
+
+    The CSV log stays the journal: each sent report is appended to it and
+    fsynced first, and only then indexed.  On open, only lines appended since
+    the last run are indexed, so if a run crashed between the two writes, the
+    missing report is picked up next time.
+    """
+
+    def __init__(self, filename, index_filename=None):
+        self.filename = str(filename)
+        self.index_filename = index_filename or self.filename + INDEX_SUFFIX
+        self.db = None
+
+    def open(self):
+        self.db = sqlite3.connect(self.index_filename)
+        with self.db:
+            self.db.execute(
+                'CREATE TABLE IF NOT EXISTS reports ('
+                '  report TEXT, period TEXT, created TEXT,'
+                '  PRIMARY KEY (report, period)'
+                ')'
+            )
+            self.db.execute(
+                'CREATE TABLE IF NOT EXISTS log (size INTEGER, head TEXT)'
+            )
+        self.update()
+        return self
+
+    def close(self):
+        if self.db is not None:
+            self.db.close()
+            self.db = None
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __contains__(self, key):
+        cursor = self.db.execute(
+            'SELECT 1 FROM reports WHERE report = ? AND period = ?', key
+        )
+        return cursor.fetchone() is not None
+
+    def __len__(self):
+        return self.db.execute('SELECT COUNT(*) FROM reports').fetchone()[0]
+
+    def get_state(self):
+        return self.db.execute('SELECT size, head FROM log').fetchone()
+
+    def update(self):
+        """Index lines appended to the log since last update."""
+        state = self.get_state()
+        size, head = state if state else (0, '')
+        try:
+            f = open(self.filename, 'rb')
+        except IOError:
+            return
+        with f:
+            first = f.readline().decode('utf-8')
+            # Log was rewritten, if its first line or size does not match.
+            reset = size > 0 and (
+                first != head or os.fstat(f.fileno()).st_size < size
+            )
+            if reset:
+                size = 0
+            f.seek(size)
+            rows = []
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                size += len(line)
+                line = line.decode('utf-8').strip()
+                if line:
+                    rows.append(parse_sent_report(line))
+
+        with self.db:
+            if reset:
+                self.db.execute('DELETE FROM reports')
+            self.db.executemany('INSERT OR IGNORE INTO reports VALUES (?, ?, ?)',
+                                rows)
+            self.db.execute('DELETE FROM log')
+            self.db.execute('INSERT INTO log VALUES (?, ?)', (size, first))
+
+    def write(self, line):
+        with open(self.filename, 'a') as f:
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+        self.update()
+
+    def compact(self):
+        """Rewrite log with one line per sent report.
+
+        Returns number of lines in the log before and after compaction.
+        """
+        self.update()
+        if not os.path.exists(self.filename):
+            return 0, 0
+        with open(self.filename, 'rb') as f:
+            before = sum(1 for line in f if line.strip())
+        rows = self.db.execute(
+            'SELECT created, report, period FROM reports ORDER BY created'
+        ).fetchall()
+        with atomic_write(self.filename) as f:
+            for row in rows:
+                f.write(u'%s,%s,%s\n' % row)
+        self.update()
+        self.db.execute('VACUUM')
+        return before, len(rows)
+
+
 class ReportsLog(object):
-    def __init__(self, dates=None, log=None, now=None):
-        self.dates = dates or set()
+    def __init__(self, reports=None, log=None, now=None):
+        self.reports = reports if reports is not None else set()
+        self.added = set()
         self.log = log
         self.now = now or datetime.datetime.now()
         self.now = self.now.strftime('%Y-%m-%d %H:%M:%S')
 
-    def __contains__(self, date):
-        return date in self.dates
+    def __contains__(self, key):
+        return key in self.added or key in self.reports
 
     def add(self, report, date):
-        self.dates.add(date)
+        self.added.add((report, date))
         return report, date
 
     def write(self, report, date):
@@ -1,8 +1,10 @@
+import os
 import gettext
 import codecs
 import itertools
 
 from pathlib import Path
+from tempfile import NamedTemporaryFile
 from contextlib import contextmanager
 from datetime import timedelta
 
@@ -110,3 +112,61 @@ def is_empty_iterable(iterable):
     except StopIteration:
         return None
     return itertools.chain([first], iterable)
+
+
+def fsync_dir(path):
+    """Flush directory entries, so that a rename in it survives a crash."""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def file_mode(filename):
+    """Return mode of existing file or mode of a new file, as open would."""
+    try:
+        return os.stat(filename).st_mode & 0o7777
+    except OSError:
+        umask = os.umask(0)
+        os.umask(umask)
+        return 0o644 & ~umask
+
+
+@contextmanager
+def atomic_write(filename, mode='w', **kwargs):
+    """Context for a temporary file, which replaces given file when written.
+
+    Temporary file is created next to the file, is flushed to disk and gets
+    mode of the replaced file, since temporary files are private.  If writing
+    fails, temporary file is removed and the file is left as it was.
+
+        >>> import os
+        >>> from tempfile import mkdtemp
+        >>> filename = os.path.join(mkdtemp(), 'file.txt')
+        >>> with atomic_write(filename) as f:
+        ...     print('content', file=f)
+        >>> print(open(filename).read(), end='')
+        content
+        >>> os.listdir(os.path.dirname(filename))
+        ['file.txt']
+
+    """
+    filename = str(filename)
+    dirname = os.path.dirname(os.path.abspath(filename))
+    f = NamedTemporaryFile(mode, dir=dirname, delete=False, **kwargs)
+    try:
+        yield f
+        f.flush()
+        os.fsync(f.fileno())
+        f.close()
+        os.chmod(f.name, file_mode(filename))
+        os.replace(f.name, filename)
+    except BaseException:
+        f.close()
+        os.unlink(f.name)
+        raise
+    fsync_dir(dirname)
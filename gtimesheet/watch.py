@@ -0,0 +1,150 @@
+"""Keep merged entries up to date, while timelog.txt or Timesheet database
+changes.
+
+Files are watched with inotify, if inotify_simple package is installed,
+otherwise they are polled.  Either way a change is detected by comparing inode,
+size and mtime of watched files, inotify only wakes the watcher up earlier.
+On each change only the tail since the last merged day is merged again.
+
+"""
+
+import os
+import time
+import datetime
+
+try:
+    import inotify_simple
+except ImportError:
+    inotify_simple = None
+
+from . import timesheet
+from .index import TimelogIndex
+from .sync import incremental_sync
+from .sync import sync_to_timesheet
+from .sync import resume_point
+from .sync import Watermark
+from .timelog import timesheets_to_timelog
+from .timelog import TimelogChanged
+from .timelog import update_timelog
+
+
+def file_signature(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+
+class Watcher(object):
+    """Wait until any of watched files change."""
+
+    def __init__(self, paths, interval=2.0, settle=0.5, sleep=time.sleep):
+        self.paths = [str(path) for path in paths]
+        self.interval = interval
+        self.settle = settle
+        self.sleep = sleep
+        self.signatures = self.snapshot()
+        self.inotify = None
+        if inotify_simple is not None:
+            flags = inotify_simple.flags
+            self.inotify = inotify_simple.INotify()
+            mask = (flags.CLOSE_WRITE | flags.MODIFY | flags.MOVED_TO |
+                    flags.CREATE | flags.DELETE)
+            for dirname in set(map(os.path.dirname, self.paths)):
+                if os.path.isdir(dirname):
+                    self.inotify.add_watch(dirname, mask)
+
+    def snapshot(self):
+        return {path: file_signature(path) for path in self.paths}
+
+    def changed(self):
+        """Return paths changed since the last check."""
+        signatures = self.snapshot()
+        changed = [path for path in self.paths
+                   if signatures[path] != self.signatures[path]]
+        self.signatures = signatures
+        return changed
+
+    def reset(self):
+        """Forget changes, for example made by ourselves."""
+        self.signatures = self.snapshot()
+
+    def idle(self, timeout):
+        if self.inotify is not None:
+            self.inotify.read(timeout=int(timeout * 1000))
+        else:
+            self.sleep(timeout)
+
+    def wait(self):
+        """Block until watched files change and stop changing."""
+        while True:
+            changed = self.changed()
+            if changed:
+                # Dropbox and editors write files in several steps.
+                while True:
+                    self.sleep(self.settle)
+                    more = self.changed()
+                    if not more:
+                        return changed
+                    changed.extend(p for p in more if p not in changed)
+            self.idle(self.interval)
+
+
+def resync(cfg, midnight):
+    """Merge entries since the last merged day and write them out.
+
+    Merged entries are written to Timesheet database, if ``cfg.write`` is set,
+    otherwise to timelog.txt.
+    """
+    timelog = str(cfg.timelog)
+    # Database is opened again each time, because it could have been replaced.
+    db = timesheet.connect(cfg.timesheet, readonly=not cfg.write)
+    try:
+        watermark = Watermark(cfg.sync_state, midnight)
+        # Offset must be taken before the watermark is moved.
+        index, since = resume = resume_point(db, timelog, midnight, watermark)
+        start = 0 if since is None else index.offset(since)
+        entries = incremental_sync(db, timelog, midnight, watermark,
+                                   save=False, policy=cfg.resolve,
+                                   resume=resume)
+        entries = sync_to_timesheet(db, entries)
+        if cfg.write:
+            inserted, updated = timesheet.write_times(db, list(entries))
+            watermark.commit(db)
+            return 'Inserted %d and updated %d Timesheet entries.' % (
+                inserted, updated,
+            )
+
+        entries = (entry for source, entry in entries)
+        lines = timesheets_to_timelog(entries, midnight=midnight)
+        status, count = update_timelog(timelog, lines, start)
+        watermark.commit(db, TimelogIndex(timelog, midnight).update())
+        if status == 'append':
+            return 'Appended %d lines to %s.' % (count, timelog)
+        elif status == 'rewrite':
+            return 'Rewrote last %d lines of %s.' % (count, timelog)
+    finally:
+        db.close()
+
+
+def watch(cfg, midnight, watcher=None):
+    """Resync on every change of timelog.txt or Timesheet database."""
+    database = str(cfg.timesheet)
+    watcher = watcher or Watcher(
+        [cfg.timelog, database, database + '-wal'], cfg.watch_interval,
+    )
+    while True:
+        try:
+            message = resync(cfg, midnight)
+        except TimelogChanged:
+            # gTimeLog wrote to timelog.txt meanwhile, merge it again.
+            watcher.sleep(watcher.settle)
+            continue
+        except Exception as e:
+            message = 'Failed to merge: %s: %s' % (type(e).__name__, e)
+        if message:
+            print('%s %s' % (datetime.datetime.now().strftime('%H:%M:%S'),
+                             message))
+        watcher.reset()
+        watcher.wait()
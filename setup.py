@@ -62,11 +62,11 @@ setup(
     # project is installed.
     install_requires = [
         'gtimelog',
-        'dataset',
         'docopt',
         'pathlib',
         'arrow',
         'matplotlib',
+        'numpy',
         'isoweek',
     ],
 
@@ -0,0 +1,58 @@
+import pickle
+import datetime
+
+import pytest
+
+from gtimesheet.entry import Entry
+from gtimesheet.timelog import timelog_to_timesheet
+from gtimesheet.sync import sync_to_timesheet
+from gtimesheet import timesheet
+
+from .test_sync import create_timesheet_db
+
+
+def at(hour):
+    return datetime.datetime(2014, 5, 6, hour)
+
+
+def test_entry_is_dict_compatible():
+    entry = Entry(date1='2014-03-31 15:48', notes='t2', color='red')
+    assert dict(entry) == {'date1': '2014-03-31 15:48', 'notes': 't2',
+                           'color': 'red'}
+    assert 'breaks' not in entry
+    with pytest.raises(KeyError):
+        entry['breaks']
+    del entry['notes']
+    del entry['color']
+    assert len(entry) == 1
+    assert '{date1}'.format(**entry) == '2014-03-31 15:48'
+    assert pickle.loads(pickle.dumps(entry)) == entry
+
+
+def test_project_names_are_shared():
+    timelog = lambda notes: {
+        'date1': at(9), 'date2': at(10), 'notes': notes,
+    }
+    projects = {'project': 1}
+    e1 = timelog_to_timesheet(timelog('client: project: a'), projects)
+    e2 = timelog_to_timesheet(timelog('client: project: b'), projects)
+    assert e1['clientName'] is e2['clientName']
+    assert e1['projectName'] is e2['projectName']
+
+
+def test_merged_entries(tmpdir):
+    db_path = str(tmpdir.join('timesheet.db'))
+    create_timesheet_db(db_path, [
+        ('2014-05-06 09:00', '2014-05-06 10:00', 'phone'),
+    ])
+    db = timesheet.connect(db_path)
+    row, = timesheet.iter_times(db)
+    entries = [
+        (row, {'date1': at(9), 'date2': at(10), 'notes': 'x'}),
+    ]
+    (source, entry), = sync_to_timesheet(db, entries)
+    assert source == 'BOTH'
+    assert isinstance(entry, Entry)
+    assert entry['id'] == 1
+    assert entry['notes'] == 'phone'
+    assert entry['working'] == 60
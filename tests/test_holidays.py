@@ -0,0 +1,55 @@
+import datetime
+
+from io import StringIO
+
+from gtimesheet.holidays import Holidays
+
+d = datetime.date
+DAY = datetime.timedelta(days=1)
+
+HOLIDAYS = '''
+2014-02-16    event 1
+2014-04-20/2  event 2
+*-12-31/2     new year
+*-02-29       leap day
+'''
+
+
+def naive_is_holiday(date):
+    return (
+        date.isoweekday() in (6, 7) or
+        date in (d(2014, 2, 16), d(2014, 4, 20), d(2014, 4, 21)) or
+        (date.month, date.day) in ((12, 31), (1, 1), (2, 29))
+    )
+
+
+def test_is_holiday():
+    holidays = Holidays([StringIO(HOLIDAYS)])
+    date = d(2011, 12, 1)
+    while date < d(2016, 3, 1):
+        assert holidays.is_holiday(date) == naive_is_holiday(date), date
+        date += DAY
+
+
+def test_is_holiday_extends_calendar():
+    holidays = Holidays([StringIO(HOLIDAYS)])
+    assert holidays.is_holiday(d(2014, 2, 16))
+    assert len(holidays.bitmap) == 365
+    assert holidays.is_holiday(d(2012, 2, 29))
+    assert holidays.is_holiday(d(2016, 12, 31))
+    assert holidays.is_holiday(datetime.datetime(2015, 1, 1, 12, 0))
+    assert not holidays.is_holiday(d(2014, 2, 17))
+    assert len(holidays.bitmap) == (d(2017, 1, 1) - d(2012, 1, 1)).days
+
+
+def test_workdays():
+    holidays = Holidays([StringIO(HOLIDAYS)])
+    assert holidays.workdays(d(2014, 4, 14), d(2014, 4, 28)) == 9
+    assert holidays.workdays(d(2014, 12, 29), d(2015, 1, 5)) == 3
+    assert holidays.workdays(d(2014, 1, 1), d(2014, 1, 1)) == 0
+
+    start, end = d(2013, 11, 1), d(2015, 2, 1)
+    expected = sum(
+        not naive_is_holiday(start + DAY * i) for i in range((end - start).days)
+    )
+    assert holidays.workdays(start, end) == expected
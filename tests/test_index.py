@@ -0,0 +1,82 @@
+import codecs
+import datetime
+
+from gtimesheet.index import TimelogIndex
+from gtimesheet.timelog import read_timelog
+
+TIMELOG = '''\
+2014-03-24 14:15: start
+2014-03-24 18:14: project: t1
+
+2014-03-25 09:40: start
+2014-03-26 01:10: project: late night
+
+2014-03-31 15:48: start
+2014-03-31 17:10: project: t2
+'''
+
+
+def test_index_days(tmpdir):
+    timelog = tmpdir.join('timelog.txt')
+    timelog.write(TIMELOG)
+    index = TimelogIndex(str(timelog), '06:00').update()
+    assert index.days == ['2014-03-24', '2014-03-25', '2014-03-31']
+    assert tmpdir.join('timelog.txt.idx').check()
+
+    data = timelog.read_binary()
+    for day, offset in zip(index.days, index.offsets):
+        assert data[offset:].startswith(day.encode('ascii'))
+
+
+def test_offset(tmpdir):
+    timelog = tmpdir.join('timelog.txt')
+    timelog.write(TIMELOG)
+    index = TimelogIndex(str(timelog), '06:00').update()
+    data = timelog.read_binary()
+    assert index.offset(datetime.date(2014, 3, 1)) == 0
+    assert data[index.offset(datetime.date(2014, 3, 26)):].startswith(
+        b'2014-03-31 15:48'
+    )
+    assert index.offset(datetime.date(2014, 4, 1)) == len(data)
+
+
+def test_appended_tail_is_indexed(tmpdir):
+    timelog = tmpdir.join('timelog.txt')
+    timelog.write(TIMELOG)
+    TimelogIndex(str(timelog), '06:00').update()
+
+    timelog.write('\n2014-04-01 09:00: start\n', mode='a')
+    index = TimelogIndex(str(timelog), '06:00')
+    assert index.load()
+    index.update()
+    assert index.days == [
+        '2014-03-24', '2014-03-25', '2014-03-31', '2014-04-01',
+    ]
+
+
+def test_rewritten_file_is_reindexed(tmpdir):
+    timelog = tmpdir.join('timelog.txt')
+    timelog.write(TIMELOG)
+    TimelogIndex(str(timelog), '06:00').update()
+
+    timelog.write('2015-01-01 09:00: start\n')
+    index = TimelogIndex(str(timelog), '06:00').update()
+    assert index.days == ['2015-01-01']
+    assert index.offsets == [0]
+
+
+def test_read_timelog_from_offset(tmpdir):
+    timelog = tmpdir.join('timelog.txt')
+    timelog.write(TIMELOG)
+    index = TimelogIndex(str(timelog), '06:00').update()
+    with codecs.open(str(timelog), encoding='utf-8') as f:
+        f.seek(index.offset(datetime.date(2014, 3, 25)))
+        entries = list(read_timelog(f, '06:00'))
+    assert entries == [
+        {'date1': datetime.datetime(2014, 3, 25, 9, 40),
+         'date2': datetime.datetime(2014, 3, 26, 1, 10),
+         'notes': 'project: late night'},
+        {'date1': datetime.datetime(2014, 3, 31, 15, 48),
+         'date2': datetime.datetime(2014, 3, 31, 17, 10),
+         'notes': 'project: t2'},
+    ]
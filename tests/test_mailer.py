@@ -0,0 +1,148 @@
+import io
+import smtplib
+
+import pytest
+
+from gtimesheet import mailer
+from gtimesheet.mailer import Session
+from gtimesheet.mailer import PasswordRequired
+from gtimesheet.mailer import smtp_session
+from gtimesheet.mailer import _batch_send_reports
+from gtimesheet.settings import Settings
+from gtimesheet.tracker import ReportsLog
+
+
+class FakeSMTP(object):
+    """Local stand-in for smtplib.SMTP, fails with queued errors."""
+
+    def __init__(self, errors, sent, connections):
+        self.errors = errors
+        self.sent = sent
+        connections.append(self)
+
+    def ehlo(self):
+        pass
+
+    def starttls(self):
+        pass
+
+    def login(self, username, password):
+        self.username = username
+        self.password = password
+
+    def sendmail(self, from_, to, message):
+        if self.errors:
+            raise self.errors.pop(0)
+        self.sent.append((from_, to, message))
+
+    def close(self):
+        pass
+
+
+class Reports(object):
+    def daily(self, date):
+        return 'To: me@example.com\n\ndaily %s' % date
+
+    def weekly(self, date):
+        return 'To: me@example.com\n\nweekly %s' % date
+
+
+def config(password='secret', ask_password=False):
+    cfg = Settings()
+    cfg.set('from_email', 'me@example.com')
+    cfg.set('email', 'list@example.com')
+    cfg.set('smtp_server', 'localhost')
+    cfg.set('smtp_port', 25)
+    cfg.set('smtp_username', 'me')
+    cfg.set('smtp_password', password)
+    cfg.set('smtp_ask_password', ask_password)
+    return cfg
+
+
+def send(errors, entries):
+    cfg = config()
+    sent = []
+    connections = []
+    factory = lambda host, port: FakeSMTP(errors, sent, connections)
+    session = Session(cfg, factory)
+    session.connect()
+
+    log = io.StringIO()
+    replog = ReportsLog(log=log)
+    failed = _batch_send_reports(cfg, session, entries, Reports(), replog,
+                                 sleep=lambda delay: None)
+    logged = [line.split(',')[1:] for line in log.getvalue().splitlines()]
+    return failed, sent, logged, connections
+
+
+def test_all_reports_are_sent_over_one_session():
+    entries = [('daily', '2014-03-30'), ('weekly', '2014/13')]
+    failed, sent, logged, connections = send([], entries)
+    assert failed == 0
+    assert len(sent) == 2
+    assert len(connections) == 1
+    assert connections[0].password == 'secret'
+    assert logged == [['daily', '2014-03-30'], ['weekly', '2014/13']]
+
+
+def test_reconnect_after_session_drops():
+    entries = [('daily', '2014-03-30'), ('weekly', '2014/13')]
+    errors = [smtplib.SMTPServerDisconnected('Connection lost')]
+    failed, sent, logged, connections = send(errors, entries)
+    assert failed == 0
+    assert len(sent) == 2
+    assert len(connections) == 2
+    assert logged == [['daily', '2014-03-30'], ['weekly', '2014/13']]
+
+
+def test_transient_failure_is_retried():
+    entries = [('daily', '2014-03-30')]
+    errors = [smtplib.SMTPDataError(451, 'Try again later')] * 2
+    failed, sent, logged, connections = send(errors, entries)
+    assert failed == 0
+    assert len(sent) == 1
+    assert logged == [['daily', '2014-03-30']]
+
+
+def test_permanent_failure_is_not_logged():
+    entries = [('daily', '2014-03-30'), ('weekly', '2014/13')]
+    errors = [smtplib.SMTPDataError(550, 'Mailbox unavailable')]
+    failed, sent, logged, connections = send(errors, entries)
+    assert failed == 1
+    assert len(sent) == 1
+    assert logged == [['weekly', '2014/13']]
+
+
+def test_give_up_after_retries():
+    entries = [('daily', '2014-03-30')]
+    errors = [smtplib.SMTPServerDisconnected('Connection lost')] * 10
+    failed, sent, logged, connections = send(errors, entries)
+    assert failed == 1
+    assert sent == []
+    assert logged == []
+
+
+def test_connect_is_retried():
+    errors = [ConnectionRefusedError('Connection refused')] * 2
+    connections = []
+
+    def factory(host, port):
+        if errors:
+            raise errors.pop(0)
+        return FakeSMTP([], [], connections)
+
+    delays = []
+    with smtp_session(config(), factory, sleep=delays.append) as session:
+        assert session.server is connections[0]
+    assert delays == [2, 4]
+
+
+def test_batch_mode_does_not_ask_for_password(monkeypatch):
+    monkeypatch.setattr(mailer, 'getpass', None)
+    connections = []
+    factory = lambda host, port: FakeSMTP([], [], connections)
+    cfg = config(password=None, ask_password=True)
+    with pytest.raises(PasswordRequired):
+        with smtp_session(cfg, factory, batch=True):
+            pass
+    assert connections == []
@@ -0,0 +1,80 @@
+import os
+import json
+import stat
+
+import pytest
+
+from gtimesheet.metrics import Metrics
+
+
+def make_metrics():
+    metrics = Metrics()
+    metrics.counter('entries_total', 'Entries.')
+    metrics.histogram('smtp_seconds', 'SMTP latency.', [1, 0.5])
+    return metrics
+
+
+def test_disabled():
+    metrics = make_metrics()
+    metrics.inc('entries_total', source='BOTH')
+    metrics.observe('smtp_seconds', 0.1)
+    assert metrics.to_prometheus() == ''
+
+
+def test_write_prometheus(tmpdir):
+    metrics = make_metrics()
+    metrics.enable()
+    metrics.inc('entries_total', source='BOTH')
+    metrics.observe('smtp_seconds', 0.5, operation='send')
+    metrics.observe('smtp_seconds', 3, operation='send')
+    metrics.write(tmpdir.join('gtimesheet.prom'))
+    assert tmpdir.join('gtimesheet.prom').read().splitlines()[2:] == [
+        'entries_total{source="BOTH"} 1',
+        '# HELP smtp_seconds SMTP latency.',
+        '# TYPE smtp_seconds histogram',
+        'smtp_seconds_bucket{le="0.5",operation="send"} 1',
+        'smtp_seconds_bucket{le="1",operation="send"} 1',
+        'smtp_seconds_bucket{le="+Inf",operation="send"} 2',
+        'smtp_seconds_sum{operation="send"} 3.5',
+        'smtp_seconds_count{operation="send"} 2',
+    ]
+    assert tmpdir.listdir() == [tmpdir.join('gtimesheet.prom')]
+
+
+def test_write_json(tmpdir):
+    metrics = make_metrics()
+    metrics.enable()
+    metrics.inc('entries_total', 2, source='TIMELOG')
+    metrics.write(tmpdir.join('gtimesheet.json'))
+    data = json.loads(tmpdir.join('gtimesheet.json').read())
+    assert data == {
+        'entries_total': {
+            'type': 'counter',
+            'help': 'Entries.',
+            'samples': [{'labels': {'source': 'TIMELOG'}, 'value': 2}],
+        },
+    }
+
+
+def test_write_mode(tmpdir):
+    path = str(tmpdir.join('gtimesheet.prom'))
+    umask = os.umask(0o022)
+    try:
+        make_metrics().write(path)
+    finally:
+        os.umask(umask)
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o644
+
+    os.chmod(path, 0o640)
+    make_metrics().write(path)
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o640
+
+
+def test_write_failure(tmpdir, monkeypatch):
+    def replace(src, dst):
+        raise OSError('disk full')
+
+    monkeypatch.setattr('os.replace', replace)
+    with pytest.raises(OSError):
+        make_metrics().write(tmpdir.join('gtimesheet.prom'))
+    assert tmpdir.listdir() == []
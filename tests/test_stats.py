@@ -0,0 +1,33 @@
+from gtimesheet.stats import day_totals
+
+
+def entry(date1, date2, notes='task', breaks=0):
+    return {'date1': date1, 'date2': date2, 'notes': notes, 'breaks': breaks}
+
+
+ENTRIES = [
+    entry('2014-03-24 14:15', '2014-03-24 18:14'),
+    entry('2014-03-25 02:00', '2014-03-25 03:00'),
+    entry('2014-03-27 10:00', '2014-03-27 11:00', notes='lunch*'),
+    entry('2014-03-31 17:10', '2014-03-31 17:38', breaks=5),
+    entry('2014-04-01 13:54', '2014-04-01 15:41'),
+]
+
+
+def assert_totals(result, expected):
+    assert [str(d) for d in result[0]] == [str(d) for d in expected[0]]
+    assert result[1].tolist() == expected[1].tolist()
+
+
+def test_day_totals_chunks():
+    for chunk_size in (1, 2, 3):
+        assert_totals(day_totals(iter(ENTRIES), chunk_size=chunk_size),
+                      day_totals(ENTRIES))
+    # Earlier days in later chunks.
+    assert_totals(day_totals(ENTRIES[::-1], chunk_size=2),
+                  day_totals(ENTRIES))
+
+
+def test_day_totals_empty():
+    days, minutes = day_totals([])
+    assert len(days) == len(minutes) == 0
@@ -1,9 +1,19 @@
+import sqlite3
 import datetime
 from pprint import pprint as pp
 
 import pytest
 
+from gtimesheet import timesheet
 from gtimesheet.sync import iter_sync
+from gtimesheet.sync import incremental_sync
+from gtimesheet.sync import Watermark
+from gtimesheet.sync import OverlapError
+from gtimesheet.sync import find_conflicts
+from gtimesheet.sync import PREFER_TIMESHEET
+from gtimesheet.sync import PREFER_TIMELOG
+from gtimesheet.sync import SPLIT
+from gtimesheet.sync import sync_to_timesheet
 
 d = lambda d: datetime.datetime.strptime(d, '%Y-%m-%d %H:%M')
 
@@ -79,3 +89,214 @@ def test_check_wrong_order():
             'notes': ''}]
     with pytest.raises(AssertionError):
         list(iter_sync(ts1, ts2))
+
+
+TIMELOG = '''\
+2014-05-05 09:00: start
+2014-05-05 12:00: project: t1
+
+2014-05-07 13:00: start
+2014-05-07 14:00: project: t2
+'''
+
+
+def create_timesheet_db(path, rows):
+    db = sqlite3.connect(path)
+    db.execute(
+        'CREATE TABLE times (id INTEGER PRIMARY KEY, date1 TEXT, date2 TEXT, '
+        'breaks INTEGER, clientName TEXT, projectName TEXT, project TEXT, '
+        'notes TEXT)'
+    )
+    insert_times(db, rows)
+    db.close()
+
+
+def insert_times(db, rows):
+    db.executemany(
+        'INSERT INTO times (date1, date2, breaks, clientName, projectName, '
+        'project, notes) VALUES (?, ?, 0, "", "project", "1", ?)', rows
+    )
+    db.commit()
+
+
+def merged_dates(entries):
+    return [
+        str((timesheet or timelog)['date1'])[:16]
+        for timesheet, timelog in entries
+    ]
+
+
+def test_incremental_sync(tmpdir):
+    db_path = str(tmpdir.join('timesheet.db'))
+    timelog = tmpdir.join('timelog.txt')
+    timelog.write(TIMELOG)
+    create_timesheet_db(db_path, [
+        ('2014-05-06 09:00', '2014-05-06 10:00', 'phone'),
+    ])
+    db = timesheet.connect(db_path)
+    watermark = Watermark(str(tmpdir.join('sync.json')), '06:00')
+
+    entries = incremental_sync(db, str(timelog), '06:00', watermark)
+    assert merged_dates(entries) == [
+        '2014-05-05 09:00', '2014-05-06 09:00', '2014-05-07 13:00',
+    ]
+
+    # Only last merged day and new entries are merged again.
+    timelog.write('2014-05-08 09:00: start\n', mode='a')
+    watermark = Watermark(str(tmpdir.join('sync.json')), '06:00')
+    entries = incremental_sync(db, str(timelog), '06:00', watermark)
+    assert merged_dates(entries) == ['2014-05-07 13:00', '2014-05-08 09:00']
+
+    # Changed timesheet rows before the watermark cause full merge.
+    insert_times(sqlite3.connect(db_path), [
+        ('2014-05-04 09:00', '2014-05-04 10:00', 'forgotten'),
+    ])
+    db = timesheet.connect(db_path)
+    watermark = Watermark(str(tmpdir.join('sync.json')), '06:00')
+    entries = incremental_sync(db, str(timelog), '06:00', watermark)
+    assert merged_dates(entries) == [
+        '2014-05-04 09:00', '2014-05-05 09:00', '2014-05-06 09:00',
+        '2014-05-07 13:00', '2014-05-08 09:00',
+    ]
+
+
+def overlapping_entries():
+    ts1 = [
+        {'date1': '2014-05-07 09:00', 'date2': '2014-05-07 10:00',
+         'breaks': 0, 'clientName': '', 'projectName': 'p', 'notes': 'a',
+         'id': 1},
+        {'date1': '2014-05-07 11:00', 'date2': '2014-05-07 14:00',
+         'breaks': 0, 'clientName': '', 'projectName': 'p', 'notes': 'b',
+         'id': 2},
+        {'date1': '2014-05-07 15:00', 'date2': '2014-05-07 16:00',
+         'breaks': 0, 'clientName': '', 'projectName': 'p', 'notes': 'c',
+         'id': 3},
+    ]
+    ts2 = [
+        {'date1': d('2014-05-07 09:00'), 'date2': d('2014-05-07 10:00'),
+         'notes': 'p: a'},
+        {'date1': d('2014-05-07 10:30'), 'date2': d('2014-05-07 11:30'),
+         'notes': 'p: x'},
+        {'date1': d('2014-05-07 12:00'), 'date2': d('2014-05-07 13:00'),
+         'notes': 'p: y'},
+        {'date1': d('2014-05-07 15:30'), 'date2': d('2014-05-07 16:30'),
+         'notes': 'p: z'},
+    ]
+    return ts1, ts2
+
+
+def merged(entries):
+    return [
+        ('TIMESHEET' if t1 else 'TIMELOG',
+         '%s -- %s' % (t1['date1'], t1['date2']) if t1 else
+         '%s -- %s' % (t2['date1'].strftime('%Y-%m-%d %H:%M'),
+                       t2['date2'].strftime('%Y-%m-%d %H:%M')))
+        for t1, t2 in entries
+    ]
+
+
+def test_overlap_error():
+    ts1, ts2 = overlapping_entries()
+    with pytest.raises(OverlapError) as e:
+        list(iter_sync(ts1, ts2))
+    assert str(e.value) == (
+        'Timesheet (2014-05-07 11:00 -- 2014-05-07 14:00: p: b) and '
+        'gTimeLog (2014-05-07 10:30 -- 2014-05-07 11:30: p: x) entries overlap.'
+    )
+
+
+def test_find_all_conflicts():
+    ts1, ts2 = overlapping_entries()
+    conflicts = find_conflicts(ts1, ts2)
+    assert [(c.t1['notes'], c.t2['notes']) for c in conflicts] == [
+        ('b', 'p: x'), ('b', 'p: y'), ('c', 'p: z'),
+    ]
+
+
+def test_prefer_timesheet():
+    ts1, ts2 = overlapping_entries()
+    assert merged(iter_sync(ts1, ts2, PREFER_TIMESHEET)) == [
+        ('TIMESHEET', '2014-05-07 09:00 -- 2014-05-07 10:00'),
+        ('TIMESHEET', '2014-05-07 11:00 -- 2014-05-07 14:00'),
+        ('TIMESHEET', '2014-05-07 15:00 -- 2014-05-07 16:00'),
+    ]
+
+
+def test_prefer_timelog():
+    ts1, ts2 = overlapping_entries()
+    assert merged(iter_sync(ts1, ts2, PREFER_TIMELOG)) == [
+        ('TIMESHEET', '2014-05-07 09:00 -- 2014-05-07 10:00'),
+        ('TIMELOG', '2014-05-07 10:30 -- 2014-05-07 11:30'),
+        ('TIMELOG', '2014-05-07 12:00 -- 2014-05-07 13:00'),
+        ('TIMELOG', '2014-05-07 15:30 -- 2014-05-07 16:30'),
+    ]
+
+
+def test_split():
+    ts1, ts2 = overlapping_entries()
+    assert merged(iter_sync(ts1, ts2, SPLIT)) == [
+        ('TIMESHEET', '2014-05-07 09:00 -- 2014-05-07 10:00'),
+        ('TIMELOG', '2014-05-07 10:30 -- 2014-05-07 11:00'),
+        ('TIMESHEET', '2014-05-07 11:00 -- 2014-05-07 12:00'),
+        ('TIMELOG', '2014-05-07 12:00 -- 2014-05-07 13:00'),
+        ('TIMESHEET', '2014-05-07 13:00 -- 2014-05-07 14:00'),
+        ('TIMESHEET', '2014-05-07 15:00 -- 2014-05-07 15:30'),
+        ('TIMELOG', '2014-05-07 15:30 -- 2014-05-07 16:30'),
+    ]
+
+
+def test_split_entry_longer_than_a_day():
+    ts1 = [{'date1': '2014-05-07 09:00', 'date2': '2014-05-09 10:00',
+            'breaks': 0, 'working': 2940, 'clientName': '',
+            'projectName': 'p', 'notes': 'a', 'id': 1}]
+    ts2 = [{'date1': d('2014-05-08 12:00'), 'date2': d('2014-05-08 13:00'),
+            'notes': 'p: x'}]
+    parts = [t1 for t1, t2 in iter_sync(ts1, ts2, SPLIT) if t1]
+    assert [(t1['date1'], t1['date2'], t1['working']) for t1 in parts] == [
+        ('2014-05-07 09:00', '2014-05-08 12:00', 27 * 60),
+        ('2014-05-08 13:00', '2014-05-09 10:00', 21 * 60),
+    ]
+
+
+def write_split(db, ts2):
+    entries = iter_sync(timesheet.iter_times(db), ts2, SPLIT)
+    return timesheet.write_times(db, list(sync_to_timesheet(db, entries)))
+
+
+def test_write_split_entries(tmpdir):
+    db_path = str(tmpdir.join('timesheet.db'))
+    create_timesheet_db(db_path, [
+        ('2014-05-07 09:00', '2014-05-07 12:00', 'a'),
+    ])
+    db = timesheet.connect(db_path, readonly=False)
+    ts2 = [{'date1': d('2014-05-07 10:00'), 'date2': d('2014-05-07 11:00'),
+            'notes': 'project: b'}]
+    assert write_split(db, ts2) == (2, 1)
+    assert [
+        (row['id'], row['date1'], row['date2'], row['notes'])
+        for row in timesheet.iter_times(db)
+    ] == [
+        (1, '2014-05-07 09:00', '2014-05-07 10:00', 'a'),
+        (2, '2014-05-07 10:00', '2014-05-07 11:00', 'b'),
+        (3, '2014-05-07 11:00', '2014-05-07 12:00', 'a'),
+    ]
+
+
+def test_write_split_entries_again(tmpdir):
+    db_path = str(tmpdir.join('timesheet.db'))
+    create_timesheet_db(db_path, [
+        ('2014-05-07 11:00', '2014-05-07 14:00', 'b'),
+    ])
+    db = timesheet.connect(db_path, readonly=False)
+    ts2 = [{'date1': d('2014-05-07 10:30'), 'date2': d('2014-05-07 11:30'),
+            'notes': 'project: x'}]
+    assert write_split(db, ts2) == (1, 0)
+    rows = list(timesheet.iter_times(db))
+    assert [(row['date1'], row['date2']) for row in rows] == [
+        ('2014-05-07 10:30', '2014-05-07 11:00'),
+        ('2014-05-07 11:00', '2014-05-07 14:00'),
+    ]
+
+    # Clipped timelog entry now starts together with its written part.
+    assert write_split(db, ts2) == (0, 0)
+    assert list(timesheet.iter_times(db)) == rows
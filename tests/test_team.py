@@ -0,0 +1,76 @@
+import datetime
+
+from gtimesheet.team import find_configs
+from gtimesheet.team import team_summaries
+from gtimesheet.team import user_summary
+
+CONFIG = '''\
+[gtimelog]
+name = %(name)s
+virtual_midnight = 06:00
+
+[gtimesheet]
+timesheet-db = %(path)s/timesheet.db
+timelog = %(path)s/%(timelog)s
+holidays = %(path)s/holidays.cfg
+sent-reports = %(path)s/sentreports.log
+part-time = 8
+smtp-ask-password = no
+'''
+
+TIMELOG = '''\
+2014-03-24 09:00: start
+2014-03-24 18:00: project: t1
+
+2014-03-25 09:00: start
+2014-03-25 16:00: project: t2
+'''
+
+
+def make_team(tmpdir):
+    tmpdir.join('timelog.txt').write(TIMELOG)
+    tmpdir.join('holidays.cfg').write('')
+    team = tmpdir.mkdir('team')
+    team.join('alice').write(CONFIG % {
+        'name': 'Alice', 'path': tmpdir, 'timelog': 'timelog.txt',
+    })
+    team.join('bob').write(CONFIG % {
+        'name': 'Bob', 'path': tmpdir, 'timelog': 'missing.txt',
+    })
+    team.join('.hidden').write('')
+    return team
+
+
+def test_user_summary(tmpdir):
+    team = make_team(tmpdir)
+    now = datetime.datetime(2014, 3, 26, 9)
+    summary = user_summary(str(team.join('alice')), now)
+    assert summary == {
+        'user': 'Alice',
+        'sources': {'TIMELOG': 2},
+        'days': 2,
+        'worktime': datetime.timedelta(hours=16),
+        'overtime': datetime.timedelta(),
+        'pending': 2,
+    }
+
+
+def test_team_summaries(tmpdir):
+    team = make_team(tmpdir)
+    configs = find_configs(str(team))
+    assert configs == [str(team.join('alice')), str(team.join('bob'))]
+
+    results = team_summaries(configs, jobs=2)
+    assert [config for config, summary, error in results] == configs
+    (alice, summary, error), (bob, failed, exception) = results
+    assert summary['user'] == 'Alice' and error is None
+    assert failed is None and isinstance(exception, IOError)
+
+
+def test_user_summary_skips_sent_reports(tmpdir):
+    team = make_team(tmpdir)
+    tmpdir.join('sentreports.log').write(
+        '2014-03-25 09:00:00,daily,2014-03-24\n'
+    )
+    now = datetime.datetime(2014, 3, 26, 9)
+    assert user_summary(str(team.join('alice')), now)['pending'] == 1
@@ -0,0 +1,144 @@
+import codecs
+import datetime
+
+import pytest
+
+from gtimesheet.timelog import read_timelog
+from gtimesheet.timelog import update_timelog
+from gtimesheet.timelog import TimelogChanged
+
+TIMELOG = '''\
+2014-03-24 14:15: start
+2014-03-24 18:14: project: t1
+
+2014-03-25 09:40: start
+2014-03-26 01:10: project: late night
+
+   
+2014-03-31 15:48: start
+2014-03-31 17:10: project: t2
+2014-03-31 17:38: project: t3
+'''
+
+days = [datetime.date(2014, 3, 20) + datetime.timedelta(days=i)
+        for i in range(14)]
+
+
+def read(filename, **kwargs):
+    with codecs.open(filename, encoding='utf-8') as f:
+        return list(read_timelog(f, '06:00', **kwargs))
+
+
+def in_range(entry, since, until):
+    day = entry['date1'] - datetime.timedelta(hours=6)
+    return (
+        (since is None or day.date() >= since) and
+        (until is None or day.date() < until)
+    )
+
+
+def test_read_timelog_range_matches_full_read(tmpdir):
+    timelog = tmpdir.join('timelog.txt')
+    timelog.write(TIMELOG)
+    entries = read(str(timelog))
+    for since in [None] + days:
+        for until in [None] + days:
+            expected = [e for e in entries if in_range(e, since, until)]
+            assert read(str(timelog), since=since, until=until) == expected
+
+
+def test_read_timelog_range_of_empty_file(tmpdir):
+    timelog = tmpdir.join('timelog.txt')
+    timelog.write('')
+    assert read(str(timelog), since=days[0]) == []
+
+
+def test_update_timelog_unchanged(tmpdir):
+    timelog = tmpdir.join('timelog.txt')
+    timelog.write('2014-03-24 14:15: start\n\n2014-03-25 09:40: start\n')
+    lines = ['2014-03-24 14:15: start', '', '2014-03-25 09:40: start']
+    assert update_timelog(str(timelog), lines) == ('unchanged', 0)
+
+
+def test_update_timelog_appends_new_lines(tmpdir):
+    timelog = tmpdir.join('timelog.txt')
+    timelog.write('2014-03-24 14:15: start\n2014-03-24 18:14: project: t1')
+    inode = timelog.stat().ino
+    lines = [
+        '2014-03-24 14:15: start',
+        '2014-03-24 18:14: project: t1',
+        '',
+        '2014-03-25 09:40: start',
+    ]
+    assert update_timelog(str(timelog), lines) == ('append', 2)
+    assert timelog.read() == '\n'.join(lines) + '\n'
+    assert timelog.stat().ino == inode
+
+
+def test_update_timelog_rewrites_from_first_difference(tmpdir):
+    timelog = tmpdir.join('timelog.txt')
+    timelog.write(
+        '2014-03-24 14:15: start\n'
+        '2014-03-24 18:14: project: t1\n'
+        '\n'
+        '2014-03-31 15:48: start\n'
+    )
+    lines = [
+        '2014-03-24 14:15: start',
+        '2014-03-24 18:14: project: t1',
+        '',
+        '2014-03-27 10:00: start',
+        '2014-03-27 11:00: project: phone',
+        '',
+        '2014-03-31 15:48: start',
+    ]
+    assert update_timelog(str(timelog), lines) == ('rewrite', 4)
+    assert timelog.read() == '\n'.join(lines) + '\n'
+    assert tmpdir.listdir() == [timelog]
+
+
+def test_update_timelog_truncates_removed_lines(tmpdir):
+    timelog = tmpdir.join('timelog.txt')
+    timelog.write('2014-03-24 14:15: start\n2014-03-24 18:14: project: t1\n')
+    assert update_timelog(str(timelog), ['2014-03-24 14:15: start']) == (
+        'rewrite', 0,
+    )
+    assert timelog.read() == '2014-03-24 14:15: start\n'
+
+
+def test_update_timelog_creates_file(tmpdir):
+    timelog = tmpdir.join('timelog.txt')
+    assert update_timelog(str(timelog), ['2014-03-24 14:15: start']) == (
+        'append', 1,
+    )
+    assert timelog.read() == '2014-03-24 14:15: start\n'
+
+
+def test_update_timelog_from_offset(tmpdir):
+    timelog = tmpdir.join('timelog.txt')
+    head = '2014-03-24 14:15: start\n2014-03-24 18:14: project: t1\n\n'
+    timelog.write(head + '2014-03-31 15:48: start\n')
+    lines = ['2014-03-31 15:48: start', '2014-03-31 17:10: project: t2']
+    assert update_timelog(str(timelog), lines, len(head)) == ('append', 1)
+    assert timelog.read() == head + '\n'.join(lines) + '\n'
+
+    lines = ['2014-03-31 15:00: start', '2014-03-31 17:10: project: t2']
+    assert update_timelog(str(timelog), lines, len(head)) == ('rewrite', 2)
+    assert timelog.read() == head + '\n'.join(lines) + '\n'
+
+
+def test_update_timelog_keeps_concurrent_changes(tmpdir):
+    timelog = tmpdir.join('timelog.txt')
+    content = '2014-03-24 14:15: start\n2014-03-24 18:14: project: t1\n'
+    timelog.write(content)
+
+    def lines():
+        yield '2014-03-24 14:00: start'
+        # gTimeLog appends a line, while timelog.txt is merged.
+        timelog.write('2014-03-24 19:00: project: t2\n', mode='a')
+        yield '2014-03-24 18:14: project: t1'
+
+    with pytest.raises(TimelogChanged):
+        update_timelog(str(timelog), lines())
+    assert timelog.read() == content + '2014-03-24 19:00: project: t2\n'
+    assert tmpdir.listdir() == [timelog]
@@ -0,0 +1,115 @@
+import sqlite3
+
+import pytest
+
+from gtimesheet import timesheet
+
+
+def create_db(path):
+    db = sqlite3.connect(path)
+    db.execute(
+        'CREATE TABLE times (id INTEGER PRIMARY KEY, date1 TEXT, date2 TEXT, '
+        'breaks INTEGER, projectName TEXT, project TEXT, notes TEXT)'
+    )
+    db.executemany(
+        'INSERT INTO times (date1, date2, breaks, projectName, project, notes) '
+        'VALUES (?, ?, ?, ?, ?, ?)', [
+            ('2014-05-08 09:00', '2014-05-08 10:00', 0, 'p2', '2', 'b'),
+            ('2014-05-07 09:00', '2014-05-07 10:00', 5, 'p1', '1', 'a'),
+        ]
+    )
+    db.commit()
+    db.close()
+
+
+def test_iter_times(tmpdir):
+    path = str(tmpdir.join('timesheet.db'))
+    create_db(path)
+    db = timesheet.connect(path)
+    assert list(timesheet.iter_times(db)) == [
+        {'id': 2, 'date1': '2014-05-07 09:00', 'date2': '2014-05-07 10:00',
+         'breaks': 5, 'projectName': 'p1', 'project': '1', 'notes': 'a'},
+        {'id': 1, 'date1': '2014-05-08 09:00', 'date2': '2014-05-08 10:00',
+         'breaks': 0, 'projectName': 'p2', 'project': '2', 'notes': 'b'},
+    ]
+    assert [row['id'] for row in timesheet.iter_times(db, '2014-05-08')] == [1]
+
+
+def test_get_project_mapping(tmpdir):
+    path = str(tmpdir.join('timesheet.db'))
+    create_db(path)
+    db = timesheet.connect(path)
+    assert timesheet.get_project_mapping(db) == {'p1': 1, 'p2': 2}
+
+
+def test_database_is_read_only(tmpdir):
+    path = str(tmpdir.join('timesheet.db'))
+    create_db(path)
+    db = timesheet.connect(path)
+    with pytest.raises(sqlite3.OperationalError):
+        db.execute('DELETE FROM times')
+
+
+def test_missing_database(tmpdir):
+    db = timesheet.connect(str(tmpdir.join('timesheet.db')))
+    assert list(timesheet.iter_times(db)) == []
+    assert timesheet.get_project_mapping(db) == {}
+    assert not tmpdir.join('timesheet.db').check()
+
+
+def test_write_times(tmpdir):
+    path = str(tmpdir.join('timesheet.db'))
+    create_db(path)
+    db = timesheet.connect(path, readonly=False)
+    rows = {row['id']: row for row in timesheet.iter_times(db)}
+    inserted, updated = timesheet.write_times(db, [
+        ('TIMESHEET', rows[2]),
+        ('BOTH', {'id': 1, 'date1': '2014-05-08 09:00',
+                  'date2': '2014-05-08 10:00', 'breaks': 0,
+                  'projectName': 'p2', 'project': '2', 'notes': 'changed'}),
+        ('TIMELOG', {'date1': '2014-05-09 09:00', 'date2': '2014-05-09 10:00',
+                     'breaks': 0, 'projectName': 'p1', 'project': '1',
+                     'notes': 'new', 'working': 60}),
+    ])
+    assert (inserted, updated) == (1, 1)
+
+    db = timesheet.connect(path)
+    assert [row['notes'] for row in timesheet.iter_times(db)] == [
+        'a', 'changed', 'new',
+    ]
+
+
+def test_write_times_matches_rows_by_id(tmpdir):
+    path = str(tmpdir.join('timesheet.db'))
+    create_db(path)
+    db = timesheet.connect(path, readonly=False)
+    rows = {row['id']: row for row in timesheet.iter_times(db)}
+    inserted, updated = timesheet.write_times(db, [
+        # Unchanged row is not written.
+        ('TIMESHEET', rows[2]),
+        # Split part with shifted start time.
+        ('BOTH', dict(rows[1], date1='2014-05-08 09:30')),
+        # Part split off a Timesheet entry.
+        ('TIMESHEET', {'date1': '2014-05-08 11:00', 'date2': '2014-05-08 12:00',
+                  'breaks': 0, 'projectName': 'p2', 'project': '2',
+                  'notes': 'b'}),
+    ])
+    assert (inserted, updated) == (1, 1)
+
+    db = timesheet.connect(path)
+    assert [(row['id'], row['date1']) for row in timesheet.iter_times(db)] == [
+        (2, '2014-05-07 09:00'), (1, '2014-05-08 09:30'),
+        (3, '2014-05-08 11:00'),
+    ]
+
+
+def test_write_times_to_new_database(tmpdir):
+    path = str(tmpdir.join('timesheet.db'))
+    db = timesheet.connect(path, readonly=False)
+    timesheet.write_times(db, [
+        ('TIMELOG', {'date1': '2014-05-09 09:00', 'date2': '2014-05-09 10:00',
+                     'breaks': 0, 'projectName': 'p1', 'project': '1',
+                     'notes': 'new'}),
+    ])
+    db = timesheet.connect(path)
+    assert [row['notes'] for row in timesheet.iter_times(db)] == ['new']
@@ -0,0 +1,112 @@
+import os
+import stat
+import datetime
+
+import pytest
+
+from gtimesheet.tracker import ReportsLog
+from gtimesheet.tracker import SentReports
+from gtimesheet.tracker import schedule
+
+LOG = '''\
+2014-03-25 09:00:00,daily,2014-03-24
+2014-03-26 09:00:00,daily,2014-03-25
+2014-03-26 09:01:00,daily,2014-03-25
+2014-04-01 09:00:00,monthly,2014-03
+'''
+
+
+def test_sent_reports(tmpdir):
+    log = tmpdir.join('sentreports.log')
+    log.write(LOG)
+    with SentReports(str(log)) as reports:
+        assert len(reports) == 3
+        assert ('daily', '2014-03-24') in reports
+        assert ('monthly', '2014-03') in reports
+        assert ('daily', '2014-03') not in reports
+    assert tmpdir.join('sentreports.log.db').check()
+
+
+def test_sent_reports_write(tmpdir):
+    log = tmpdir.join('sentreports.log')
+    log.write(LOG)
+    with SentReports(str(log)) as reports:
+        replog = ReportsLog(reports, reports, now=datetime.datetime(2014, 4, 2))
+        replog.write('weekly', '2014/14')
+        assert ('weekly', '2014/14') in reports
+    assert log.read().endswith('2014-04-02 00:00:00,weekly,2014/14\n')
+
+
+def test_sent_reports_appended_outside(tmpdir):
+    log = tmpdir.join('sentreports.log')
+    log.write(LOG)
+    SentReports(str(log)).open().close()
+
+    # Line written to the log, but not indexed, and an incomplete line.
+    log.write('2014-04-02 09:00:00,weekly,2014/13\n2014-04-0', mode='a')
+    with SentReports(str(log)) as reports:
+        assert ('weekly', '2014/13') in reports
+        assert reports.get_state()[0] == len(LOG) + 35
+
+
+def test_sent_reports_rewritten(tmpdir):
+    log = tmpdir.join('sentreports.log')
+    log.write(LOG)
+    SentReports(str(log)).open().close()
+
+    log.write('2014-04-02 09:00:00,weekly,2014/13\n')
+    with SentReports(str(log)) as reports:
+        assert len(reports) == 1
+        assert ('daily', '2014-03-24') not in reports
+
+
+def test_sent_reports_compact(tmpdir):
+    log = tmpdir.join('sentreports.log')
+    log.write(LOG)
+    with SentReports(str(log)) as reports:
+        assert reports.compact() == (4, 3)
+        assert len(reports) == 3
+        assert reports.get_state()[0] == len(log.read())
+    assert log.read() == (
+        '2014-03-25 09:00:00,daily,2014-03-24\n'
+        '2014-03-26 09:00:00,daily,2014-03-25\n'
+        '2014-04-01 09:00:00,monthly,2014-03\n'
+    )
+
+
+def test_sent_reports_compact_keeps_mode(tmpdir):
+    log = tmpdir.join('sentreports.log')
+    log.write(LOG)
+    os.chmod(str(log), 0o640)
+    with SentReports(str(log)) as reports:
+        reports.compact()
+    assert stat.S_IMODE(os.stat(str(log)).st_mode) == 0o640
+
+
+def test_sent_reports_compact_failure(tmpdir, monkeypatch):
+    log = tmpdir.join('sentreports.log')
+    log.write(LOG)
+
+    def replace(src, dst):
+        raise OSError('disk full')
+
+    monkeypatch.setattr('os.replace', replace)
+    with SentReports(str(log)) as reports:
+        with pytest.raises(OSError):
+            reports.compact()
+    assert log.read() == LOG
+    assert sorted(os.listdir(str(tmpdir))) == [
+        'sentreports.log', 'sentreports.log.db',
+    ]
+
+
+def test_schedule_uses_report_type(tmpdir):
+    log = tmpdir.join('sentreports.log')
+    log.write('2014-04-01 09:00:00,daily,2014-03\n')
+    now = datetime.datetime(2014, 4, 2, 9)
+    entries = [{'date1': '2014-03-31 15:48'}]
+    with SentReports(str(log)) as reports:
+        replog = ReportsLog(reports, now=now)
+        assert list(schedule(entries, replog, now=now)) == [
+            ('daily', '2014-03-31'), ('monthly', '2014-03'),
+        ]
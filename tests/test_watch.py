@@ -0,0 +1,138 @@
+import sqlite3
+import datetime
+import collections
+
+import pytest
+
+from gtimesheet import watch
+from gtimesheet.watch import resync
+from gtimesheet.watch import Watcher
+from gtimesheet.timelog import TimelogChanged
+from gtimesheet.sync import Watermark
+from gtimesheet.settings import Settings
+
+from .test_sync import TIMELOG
+from .test_sync import create_timesheet_db
+from .test_sync import insert_times
+
+CONFIG = '''\
+[gtimelog]
+virtual_midnight = 06:00
+
+[gtimesheet]
+timesheet-db = %(path)s/timesheet.db
+timelog = %(path)s/timelog.txt
+sync-state = %(path)s/sync.json
+smtp-ask-password = no
+'''
+
+
+def test_watcher_changed(tmpdir):
+    path = tmpdir.join('timelog.txt')
+    path.write('')
+    watcher = Watcher([str(path), str(tmpdir.join('missing'))],
+                      sleep=lambda seconds: None)
+    assert watcher.changed() == []
+    path.write('2014-05-05 09:00: start\n', mode='a')
+    assert watcher.changed() == [str(path)]
+    assert watcher.changed() == []
+    path.remove()
+    assert watcher.wait() == [str(path)]
+
+
+def test_resync(tmpdir):
+    tmpdir.join('timelog.txt').write(TIMELOG)
+    tmpdir.join('gtimelogrc').write(CONFIG % {'path': tmpdir})
+    db_path = str(tmpdir.join('timesheet.db'))
+    create_timesheet_db(db_path, [])
+    cfg = Settings()
+    cfg.load(collections.defaultdict(
+        lambda: None, {'--config': str(tmpdir.join('gtimelogrc'))},
+    ))
+
+    assert resync(cfg, '06:00') is None
+
+    insert_times(sqlite3.connect(db_path), [
+        ('2014-05-07 15:00', '2014-05-07 16:00', 'phone'),
+    ])
+    assert resync(cfg, '06:00') == 'Appended 2 lines to %s.' % cfg.timelog
+    assert tmpdir.join('timelog.txt').read() == TIMELOG + (
+        '2014-05-07 15:00: break ***\n'
+        '2014-05-07 16:00: project: phone\n'
+    )
+
+    db = sqlite3.connect(db_path)
+    db.execute('UPDATE times SET notes = "call" WHERE notes = "phone"')
+    db.commit()
+    assert resync(cfg, '06:00') == (
+        'Rewrote last 1 lines of %s.' % cfg.timelog
+    )
+    assert tmpdir.join('timelog.txt').read() == TIMELOG + (
+        '2014-05-07 15:00: break ***\n'
+        '2014-05-07 16:00: project: call\n'
+    )
+
+
+def test_resync_checks_watermark_once(tmpdir, monkeypatch):
+    tmpdir.join('timelog.txt').write(TIMELOG)
+    tmpdir.join('gtimelogrc').write(CONFIG % {'path': tmpdir})
+    create_timesheet_db(str(tmpdir.join('timesheet.db')), [])
+    cfg = Settings()
+    cfg.load(collections.defaultdict(
+        lambda: None, {'--config': str(tmpdir.join('gtimelogrc'))},
+    ))
+    resync(cfg, '06:00')
+
+    calls = []
+    since = Watermark.since
+    monkeypatch.setattr(Watermark, 'since',
+                        lambda self, *args: calls.append(args) or
+                        since(self, *args))
+    resync(cfg, '06:00')
+    assert len(calls) == 1
+
+
+def test_resync_write_resumes_from_last_day(tmpdir, monkeypatch):
+    tmpdir.join('timelog.txt').write(TIMELOG)
+    tmpdir.join('gtimelogrc').write(CONFIG % {'path': tmpdir})
+    create_timesheet_db(str(tmpdir.join('timesheet.db')), [])
+    cfg = Settings()
+    cfg.load(collections.defaultdict(lambda: None, {
+        '--config': str(tmpdir.join('gtimelogrc')), '--write': True,
+    }))
+    assert resync(cfg, '06:00') == (
+        'Inserted 2 and updated 0 Timesheet entries.'
+    )
+
+    # Watermark covers the rows written by the previous run.
+    days = []
+    since = Watermark.since
+    monkeypatch.setattr(Watermark, 'since',
+                        lambda self, *args: days.append(since(self, *args)) or
+                        days[-1])
+    assert resync(cfg, '06:00') == (
+        'Inserted 0 and updated 0 Timesheet entries.'
+    )
+    assert days == [datetime.date(2014, 5, 7)]
+
+
+def test_watch_merges_again_after_concurrent_change(tmpdir, monkeypatch):
+    results = [TimelogChanged('timelog.txt'), None]
+
+    def resync(cfg, midnight):
+        result = results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def stop():
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(watch, 'resync', resync)
+    watcher = Watcher([str(tmpdir.join('timelog.txt'))],
+                      sleep=lambda seconds: None)
+    monkeypatch.setattr(watcher, 'wait', stop)
+    cfg = collections.namedtuple('cfg', 'timesheet')('timesheet.db')
+    with pytest.raises(KeyboardInterrupt):
+        watch.watch(cfg, '06:00', watcher)
+    assert results == []